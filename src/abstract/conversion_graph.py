@@ -0,0 +1,82 @@
+import math
+from collections import defaultdict
+
+# assets valued at par with a fiat currency, used to connect exchange tickers to the valuation currency
+STABLE_COIN_PEGS = {
+    "USDT": ("USD", 1.0),
+    "USDC": ("USD", 1.0),
+    "BUSD": ("USD", 1.0),
+    "TUSD": ("USD", 1.0),
+}
+
+
+def to_float(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+class ConversionGraph:
+    """
+    Currency conversion graph built once from a bulk ticker snapshot.
+
+    Every ticker `(base, quote, price, quote_volume)` is an edge in both directions. The rate of an asset in a
+    target currency follows the path with the fewest hops, preferring among those the one whose least liquid leg has
+    the highest quote volume. One breadth-first search from the target prices every reachable asset and the result
+    is memoized per target, so valuing many assets costs no further requests.
+
+    Tickers whose quote volume is below `min_volume`, valued in `volume_currency`, are left out, so dead pairs with
+    stale last prices cannot win on hop count.
+    """
+
+    def __init__(self, tickers, pegs=None, min_volume=0.0, volume_currency="USD"):
+        tickers = [ticker for ticker in tickers if ticker[2] is not None and ticker[2] > 0]
+        self._build(tickers, pegs)
+        if min_volume > 0:
+            # every ticker's volume is in its own quote asset, value them all in one currency before comparing
+            quote_rates = self._rates_to(volume_currency)
+            self._build([t for t in tickers if (t[3] or 0.0) * quote_rates.get(t[1], 0.0) >= min_volume], pegs)
+
+    def _build(self, tickers, pegs):
+        self._edges = defaultdict(dict)
+        self._rates = {}
+        for base, quote, price, volume in tickers:
+            self._add_edge(base, quote, price, volume or 0.0)
+        for asset, (target, rate) in (pegs or {}).items():
+            self._add_edge(asset, target, rate, math.inf)
+
+    def _add_edge(self, base, quote, price, volume):
+        if quote in self._edges[base] and self._edges[base][quote][1] >= volume:
+            return
+        self._edges[base][quote] = (price, volume)
+        self._edges[quote][base] = (1 / price, volume)
+
+    def _rates_to(self, target):
+        if target in self._rates:
+            return self._rates[target]
+        rates = {target: 1.0}
+        bottleneck = {target: math.inf}
+        layer = [target]
+        while layer:
+            candidates = {}
+            for node in layer:
+                for neighbor, (rate, volume) in self._edges[node].items():
+                    if neighbor in rates:
+                        continue
+                    liquidity = min(bottleneck[node], volume)
+                    if neighbor not in candidates or liquidity > candidates[neighbor][1]:
+                        # the edge node -> neighbor has rate `rate`, so one neighbor is worth 1 / rate nodes
+                        candidates[neighbor] = (rates[node] / rate, liquidity)
+            for neighbor, (rate, liquidity) in candidates.items():
+                rates[neighbor] = rate
+                bottleneck[neighbor] = liquidity
+            layer = list(candidates)
+        self._rates[target] = rates
+        return rates
+
+    def rate(self, asset, target="USD"):
+        """Value of one unit of `asset` in `target`, or None when no path connects them."""
+        return self._rates_to(target).get(asset)
+
+    def __contains__(self, asset):
+        return asset in self._edges
@@ -1,11 +1,45 @@
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import pandas as pd
 
+from src.abstract.conversion_graph import STABLE_COIN_PEGS, ConversionGraph
+from src.abstract.normalization import FLOAT_COLUMNS, normalize_trades
+
+_exchange_semaphores = {}
+_exchange_semaphores_lock = threading.Lock()
+
+
+class NoTradesError(Exception):
+    """Raised by `get_trades` when the exchange returned no fills for the requested pair and range."""
+
 
 class ExchangeClientWrapper(ABC):
+    # max number of requests in flight against one exchange, shared by all instances of a wrapper class
+    max_concurrency = 4
+    balance_index = "asset"
+    # currency every price is expressed in, and how long a ticker snapshot is used before it is fetched again
+    valuation_currency = "USD"
+    conversion_pegs = STABLE_COIN_PEGS
+    conversion_ttl = 60
+    # after a failed snapshot, how long prices come from `usd_price_for` before the graph is built again
+    conversion_retry_delay = 60
+    # 24h volume, in `valuation_currency`, below which a ticker is too illiquid to price through
+    conversion_min_volume = 10_000
+    # decimals kept for fees in fixed-point mode, on top of the pair's own assets (fees may be paid in e.g. BNB/KCS)
+    commission_decimals = 8
+
     def __init__(self, client):
         self.client = client
+        self._conversion_graph = None
+        self._conversion_graph_built_at = 0.0
+        self._conversion_graph_failed_at = None
+        self._conversion_graph_lock = threading.Lock()
+        self.fixed_point_scales = None
+        self._pair_assets = {}
 
     @staticmethod
     @abstractmethod
@@ -20,13 +54,92 @@ class ExchangeClientWrapper(ABC):
     def get_asset_balance(self, asset):
         pass
 
+    def ticker_snapshot(self):
+        """Return every ticker of the exchange as `(base, quote, last price, quote volume)` from one bulk request."""
+        raise NotImplementedError("bulk tickers done by exchange specifications")
+
+    def conversion_graph(self):
+        """
+        The conversion graph of the latest ticker snapshot, or None when the snapshot failed less than
+        `conversion_retry_delay` seconds ago or the exchange has no bulk tickers.
+        """
+        # concurrent `price_for` calls wait for one snapshot instead of each fetching their own
+        with self._conversion_graph_lock:
+            now = time.time()
+            if self._conversion_graph is not None and now - self._conversion_graph_built_at <= self.conversion_ttl:
+                return self._conversion_graph
+            failed_at = self._conversion_graph_failed_at
+            if failed_at is not None and now - failed_at <= self.conversion_retry_delay:
+                return None
+            try:
+                self._conversion_graph = ConversionGraph(
+                    self.ticker_snapshot(),
+                    pegs=self.conversion_pegs,
+                    min_volume=self.conversion_min_volume,
+                    volume_currency=self.valuation_currency,
+                )
+            except Exception as e:
+                if not isinstance(e, NotImplementedError):
+                    print(f"conversion graph build failed, pricing assets one by one {e!r}")
+                self._conversion_graph = None
+                self._conversion_graph_failed_at = now
+                return None
+            self._conversion_graph_built_at = now
+            self._conversion_graph_failed_at = None
+            return self._conversion_graph
+
+    def price_for(self, asset):
+        """
+        Price of `asset` in `valuation_currency` from the cached conversion graph, falling back to the exchange's
+        `usd_price_for` lookup when the graph cannot be built or has no path for the asset.
+        """
+        graph = self.conversion_graph()
+        rate = graph.rate(asset, self.valuation_currency) if graph is not None else None
+        if rate is None:
+            return self.usd_price_for(asset)
+        return rate
+
+    def _exchange_semaphore(self):
+        with _exchange_semaphores_lock:
+            if type(self) not in _exchange_semaphores:
+                _exchange_semaphores[type(self)] = threading.BoundedSemaphore(self.max_concurrency)
+            return _exchange_semaphores[type(self)]
+
+    def fan_out(self, calls):
+        """
+        Run the zero-argument `calls` concurrently and return their results in order.
+
+        At most `max_concurrency` calls per exchange are in flight at once, across all wrapper instances.
+        """
+        semaphore = self._exchange_semaphore()
+
+        def run(call):
+            with semaphore:
+                return call()
+
+        if len(calls) <= 1:
+            return [run(call) for call in calls]
+        with ThreadPoolExecutor(max_workers=min(len(calls), self.max_concurrency)) as executor:
+            return list(executor.map(run, calls))
+
+    def pair_assets(self, trading_pair):
+        """`symbol_info` memoized per instance: the market catalog is fetched once per pair for a long-lived wrapper."""
+        if trading_pair in self._pair_assets:
+            return self._pair_assets[trading_pair]
+        assets = self.symbol_info(trading_pair)
+        if assets is not None:
+            self._pair_assets[trading_pair] = assets
+        return assets
+
     def get_current_asset_balance(self, trading_pair):
-        base_asset, quote_asset = self.symbol_info(trading_pair)
-        df = pd.DataFrame(columns=["asset"], data=[base_asset, quote_asset])
-        df["price"] = df["asset"].apply(lambda x: self.usd_price_for(x))
-        df["balance"] = df["asset"].apply(lambda x: self.get_asset_balance(x))
+        base_asset, quote_asset = self.pair_assets(trading_pair)
+        assets = [base_asset, quote_asset]
+        results = self.fan_out(
+            [partial(self.price_for, x) for x in assets] + [partial(self.get_asset_balance, x) for x in assets]
+        )
+        df = pd.DataFrame({self.balance_index: assets, "price": results[:2], "balance": results[2:]})
         df["quote_value"] = df["price"] * df["balance"]
-        df.set_index("asset", inplace=True, drop=True)
+        df.set_index(self.balance_index, inplace=True, drop=True)
         base_asset_price = df.at[base_asset, "price"]
         quote_asset_price = df.at[quote_asset, "price"]
         return df, base_asset, quote_asset, base_asset_price, quote_asset_price
@@ -35,9 +148,53 @@ class ExchangeClientWrapper(ABC):
     def get_trades(self, symbol, start_date, end_date):
         pass
 
-    @abstractmethod
+    def iter_trade_pages(self, symbol, start_date, end_date):
+        """Yield the raw (not yet normalized) trade pages of `symbol` as they are downloaded."""
+        raise NotImplementedError("trade pagination done by exchange specifications")
+
+    def has_trades_after(self, symbol, last_fill, end_date):
+        """
+        Whether `symbol` has fills after the `last_fill` timestamp up to `end_date`, from the first page of that
+        window only, so checking a cached range costs a single request.
+        """
+        start_date = last_fill.value // 1_000_000
+        page = next(iter(self.iter_trade_pages(symbol, start_date, end_date)), None)
+        if page is None or len(page) == 0:
+            return False
+        times = page[self.normalization.source("date_time")]
+        if self.normalization.time_unit is not None:
+            times = pd.to_datetime(times, unit=self.normalization.time_unit)
+        # pages start at whole seconds on some exchanges, so the cached last fill itself may come back
+        return bool((times > last_fill).any())
+
     def format_data(self, df):
-        pass
+        return normalize_trades(df, self.normalization, self.price_for, self.fixed_point_scales)
+
+    def asset_decimals(self, trading_pair):
+        """Return `(price decimals, base asset decimals, quote asset decimals)` of a pair from the market catalog."""
+        raise NotImplementedError("market precisions done by exchange specifications")
+
+    def enable_fixed_point(self, trading_pair):
+        """
+        Switch `get_trades` to exact fixed-point columns for `trading_pair`: price, qty, quoteQty and commission are
+        kept as the exchange's decimal strings and parsed into int64 scaled by the catalog precisions, which are
+        returned and kept in `fixed_point_scales` for `fixed_point_pnl_calculate`/`fixed_point_trading_fees`.
+        """
+        price_decimals, base_decimals, quote_decimals = self.asset_decimals(trading_pair)
+        self.fixed_point_scales = {
+            "price": price_decimals,
+            "qty": base_decimals,
+            # price * qty needs the decimals of both factors to stay exact
+            "quoteQty": price_decimals + base_decimals if self.normalization.quote_from_price else quote_decimals,
+            "commission": max(base_decimals, quote_decimals, self.commission_decimals),
+        }
+        decimal_sources = {self.normalization.source(column) for column in FLOAT_COLUMNS}
+        self.trade_schema = {k: v for k, v in type(self).trade_schema.items() if k not in decimal_sources}
+        return self.fixed_point_scales
+
+    def disable_fixed_point(self):
+        self.fixed_point_scales = None
+        self.__dict__.pop("trade_schema", None)
 
     @abstractmethod
     def symbol_info(self):
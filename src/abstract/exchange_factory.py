@@ -0,0 +1,27 @@
+import importlib
+
+# exchange name -> (module, wrapper class, trading pair separator)
+EXCHANGES = {
+    "binance": ("src.binance.binance_client_wrapper", "BinanceClientWrapper", ""),
+    "kucoin": ("src.kucoin.kucoin_client_wrapper", "KucoinClientWrapper", "-"),
+    "ascendex": ("src.ascendex.ascendex_client_wrapper", "AscendexClientWrapper", "/"),
+    "gate_io": ("src.gate_io.GateIoClientWrapper", "GateIoClientWrapper", "_"),
+    "btc_markets": ("src.btc_markets.btc_markets_client_wrapper", "BTCMarketsClientWrapper", "-"),
+}
+
+
+def wrapper_class(exchange):
+    if exchange not in EXCHANGES:
+        raise Exception(f"Exchange {exchange} is not supported")
+    module_name, class_name, _ = EXCHANGES[exchange]
+    # exchange SDKs are imported lazily so only the ones in use need to be installed
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_client(exchange, **credentials):
+    """Build the wrapper for `exchange`; `credentials` are passed to its `create_instance` factory."""
+    return wrapper_class(exchange).create_instance(**credentials)
+
+
+def trading_pair(exchange, base_asset, quote_asset):
+    return f"{base_asset}{EXCHANGES[exchange][2]}{quote_asset}"
@@ -1,21 +1,38 @@
 import json
+import time
 from abc import ABC, abstractmethod
+from fnmatch import fnmatch
 from urllib.parse import urljoin
 
 import requests
 
+from src.abstract.httpRequest.response_cache import ResponseCache
+
 
 class BaseRestApi(ABC):
-    def __init__(self, key, secret, url):
+    # ttl in seconds per unauthenticated endpoint, keyed by a glob over the uri path; unlisted endpoints are not cached
+    cache_ttls = {}
+
+    def __init__(self, key, secret, url, response_cache=None):
         self.url = url
         self.key = key
         self.secret = secret
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        # every request goes through `transport`, which a record/replay cassette can stand in for
+        self.transport = requests.request
 
     @abstractmethod
     def _headers(self, header_meta=None):
         raise NotImplementedError("headers done by exchange specifications")
 
+    def _cache_ttl(self, uri):
+        for pattern, ttl in self.cache_ttls.items():
+            if fnmatch(uri, pattern):
+                return ttl
+        return 0
+
     def _request(self, method, uri, timeout=30, auth=True, params=None, header_meta=None):
+        path = uri
         data_json = ""
         if method in ["GET", "DELETE"]:
             if params:
@@ -33,8 +50,26 @@ class BaseRestApi(ABC):
             headers = {"Accept": "application/json"}
 
         url = urljoin(self.url, uri)
+
+        ttl = 0 if auth or method != "GET" else self._cache_ttl(path)
+        if ttl > 0:
+            cache_key = ResponseCache.make_key(method, url)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                if cached.is_fresh(time.time()):
+                    return cached.data
+                headers.update(cached.validators())
+
         if method in ["GET", "DELETE"]:
-            response_data = requests.request(method, url, headers=headers, timeout=timeout)
+            response_data = self.transport(method, url, headers=headers, timeout=timeout)
         else:
-            response_data = requests.request(method, url, headers=headers, data=data_json, timeout=timeout)
+            response_data = self.transport(method, url, headers=headers, data=data_json, timeout=timeout)
+
+        if ttl > 0:
+            if response_data.status_code == 304 and cached is not None:
+                self.response_cache.touch(cache_key, cached)
+                return cached.data
+            data = self.check_response_data(response_data)
+            self.response_cache.put(cache_key, data, ttl, response_data.headers)
+            return data
         return self.check_response_data(response_data)
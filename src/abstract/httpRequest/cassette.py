@@ -0,0 +1,187 @@
+import gzip
+import os
+import pickle
+import time
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from src.abstract.httpRequest.base_rest_api import BaseRestApi
+from src.abstract.httpRequest.columnar import loads
+
+# query parameters that carry credentials or per-request signatures, never written to a cassette
+REDACTED_PARAMS = {"signature", "timestamp", "recvWindow", "apiKey", "api_key", "token", "connectId"}
+# keys of SDK call results that are live credentials, such as Kucoin's private WebSocket token
+REDACTED_RESULT_KEYS = {"token", "listenKey"}
+# the only attributes of an SDK exception kept in a cassette, its response and request hold the API key and signature
+ERROR_ATTRIBUTES = ["code", "message", "status_code"]
+# attributes of the wrappers holding SDK clients
+SDK_CLIENT_ATTRIBUTES = ["client", "spotClient", "marketClient", "tradeClient"]
+
+
+def redact_url(url):
+    parts = urlsplit(url)
+    query = [(k, "REDACTED" if k in REDACTED_PARAMS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def redact_result(result):
+    if isinstance(result, dict) and REDACTED_RESULT_KEYS & result.keys():
+        return {k: "REDACTED" if k in REDACTED_RESULT_KEYS else v for k, v in result.items()}
+    return result
+
+
+def record_error(e):
+    attributes = {k: getattr(e, k) for k in ERROR_ATTRIBUTES if isinstance(getattr(e, k, None), (str, int, float))}
+    return {"type": type(e), "message": str(e), "attributes": attributes}
+
+
+def replay_error(error):
+    """Rebuild a recorded exception without calling its constructor, which may require the original response."""
+    e = error["type"].__new__(error["type"])
+    e.args = (error["message"],)
+    for k, v in error["attributes"].items():
+        setattr(e, k, v)
+    return e
+
+
+class ReplayedResponse:
+    """The subset of `requests.Response` the `check_response_data` implementations use."""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return loads(self.content)
+
+
+class Cassette:
+    """
+    Record responses at the transport boundary once, then replay them offline.
+
+    HTTP requests of `BaseRestApi` clients are recorded with their status, headers and body, SDK client calls
+    (python-binance, gate_api, kucoin) with their return value or the type, code and message of their exception.
+    Signatures, timestamps and API keys are never stored: request headers are dropped, credential query parameters
+    and returned tokens redacted. Replay serves the recorded pages in recording order for each request, at full speed
+    or, with `realtime=True`, after the recorded latency.
+    """
+
+    def __init__(self, path, mode="replay", realtime=False):
+        if mode not in ["record", "replay"]:
+            raise ValueError(f"Unknown cassette mode {mode}")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self._entries = []
+        self._queues = defaultdict(deque)
+        if mode == "replay":
+            with gzip.open(path, "rb") as f:
+                self._entries = pickle.load(f)
+            for entry in self._entries:
+                self._queues[entry["key"]].append(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.save()
+
+    def save(self):
+        if self.mode != "record":
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, "wb") as f:
+            pickle.dump(self._entries, f)
+
+    def _replay(self, key):
+        if not self._queues[key]:
+            raise KeyError(f"No recorded response left for {key}")
+        entry = self._queues[key].popleft()
+        if self.realtime:
+            time.sleep(entry["elapsed"])
+        return entry
+
+    def transport(self, inner=requests.request):
+        """A drop-in for `requests.request` that records through `inner` or replays."""
+
+        def request(method, url, **kwargs):
+            key = ("http", method, redact_url(url))
+            if self.mode == "replay":
+                entry = self._replay(key)
+                return ReplayedResponse(entry["status"], entry["headers"], entry["body"])
+            started = time.time()
+            response = inner(method, url, **kwargs)
+            self._entries.append(
+                {
+                    "key": key,
+                    "elapsed": time.time() - started,
+                    "status": response.status_code,
+                    "headers": dict(response.headers),
+                    "body": response.content,
+                }
+            )
+            return response
+
+        return request
+
+    def wrap(self, target, name):
+        return CassetteProxy(self, target, name)
+
+    def call(self, name, method, func, args, kwargs):
+        key = ("sdk", name, method, repr(args), repr(sorted(kwargs.items())))
+        if self.mode == "replay":
+            entry = self._replay(key)
+            if "error" in entry:
+                raise replay_error(entry["error"])
+            return entry["result"]
+        started = time.time()
+        entry = {"key": key}
+        try:
+            result = func(*args, **kwargs)
+            entry["result"] = redact_result(result)
+            return result
+        except Exception as e:
+            entry["error"] = record_error(e)
+            raise
+        finally:
+            entry["elapsed"] = time.time() - started
+            self._entries.append(entry)
+
+
+class CassetteProxy:
+    """Forwards attribute access to an SDK client and routes its method calls through a cassette."""
+
+    def __init__(self, cassette, target, name):
+        self._cassette = cassette
+        self._target = target
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            return self._cassette.call(self._name, attr, value, args, kwargs)
+
+        return call
+
+
+def use_cassette(wrapper, cassette):
+    """Route all exchange traffic of an `ExchangeClientWrapper` through `cassette`."""
+    for attribute in SDK_CLIENT_ATTRIBUTES:
+        client = getattr(wrapper, attribute, None)
+        if client is None:
+            continue
+        if isinstance(client, BaseRestApi):
+            client.transport = cassette.transport()
+        else:
+            setattr(wrapper, attribute, cassette.wrap(client, attribute))
+    return wrapper
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ujson as json_lib
+except ImportError:
+    import json as json_lib
+
+
+def loads(content):
+    """Parse a JSON response body (bytes or str) with ujson when it is installed."""
+    return json_lib.loads(content)
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return math.nan
+    return float(value)
+
+
+def records_to_columns(records, schema):
+    """
+    Transpose decoded records into one typed numpy array per column.
+
+    `schema` maps column names to a numpy dtype. Numeric columns are converted straight from the exchange's decimal
+    strings while being transposed, so the resulting frame needs no `pd.to_numeric`/`astype` pass. Columns absent
+    from `schema` get the dtype pandas infers for them, like a frame built from the records would.
+    """
+    n = len(records)
+    if n == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in schema.items()}
+    names = list(records[0].keys())
+    names += [name for name in schema if name not in records[0]]
+    columns = {}
+    for name in names:
+        values = [r.get(name) for r in records]
+        if name not in schema:
+            columns[name] = pd.Series(values).to_numpy()
+            continue
+        dtype = np.dtype(schema[name])
+        if dtype.kind in "fiu":
+            try:
+                # numpy parses decimal strings in C, only fall back to python for missing values
+                columns[name] = np.array(values, dtype=dtype)
+            except (TypeError, ValueError):
+                columns[name] = np.array([_to_float(v) for v in values], dtype=dtype)
+        else:
+            columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+def frame_from_records(records, schema):
+    return pd.DataFrame(records_to_columns(records, schema), copy=False)
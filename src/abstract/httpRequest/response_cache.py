@@ -0,0 +1,73 @@
+import shelve
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass
+class CachedResponse:
+    data: Any
+    stored_at: float
+    ttl: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, now):
+        return now - self.stored_at < self.ttl
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Cache of decoded responses for unauthenticated requests, keyed on method + url (query string included).
+
+    Entries are served without a request while younger than their ttl. Stale entries that carried an `ETag` or
+    `Last-Modified` header are kept so the next request can be made conditional and a `304 Not Modified` reuses the
+    cached body. Pass `path` to persist entries to disk between runs.
+    """
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._entries = shelve.open(path) if path else {}
+
+    @staticmethod
+    def make_key(method, url):
+        return f"{method} {url}"
+
+    def get(self, key) -> Optional[CachedResponse]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, data, ttl, headers=None):
+        headers = headers or {}
+        entry = CachedResponse(
+            data=data,
+            stored_at=time.time(),
+            ttl=ttl,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def touch(self, key, entry: CachedResponse):
+        entry.stored_at = time.time()
+        with self._lock:
+            self._entries[key] = entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        if isinstance(self._entries, shelve.Shelf):
+            self._entries.close()
@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.processing.fixed_point import fixed_point_column
+
+TRADE_COLUMNS = [
+    "price",
+    "qty",
+    "quoteQty",
+    "commission",
+    "commissionAsset",
+    "side",
+    "commissionAssetUsdPrice",
+    "date_time",
+]
+FLOAT_COLUMNS = ["price", "qty", "quoteQty", "commission"]
+# appended after TRADE_COLUMNS for exchanges reporting the liquidity side of their fills
+MAKER_COLUMN = "isMaker"
+
+
+@dataclass(frozen=True)
+class TradeNormalization:
+    """
+    Declarative description of how an exchange's raw trade frame maps onto the canonical trade frame.
+
+    `sources` maps canonical column names to the exchange's column names (unlisted columns keep their name),
+    `side_values` maps the exchange's side encoding to "buy"/"sell", `fixed` gives constant values for columns the
+    exchange does not report, `time_unit` is the unit of the exchange's timestamp column (None when it is already a
+    datetime), `quote_from_price` computes `quoteQty` as price * qty and `maker_values` maps the exchange's
+    liquidity encoding to True for maker fills, adding an `isMaker` column.
+    """
+
+    sources: Mapping[str, str] = field(default_factory=dict)
+    side_values: Optional[Mapping[Any, str]] = None
+    fixed: Mapping[str, Any] = field(default_factory=dict)
+    time_unit: Optional[str] = "ms"
+    quote_from_price: bool = False
+    maker_values: Optional[Mapping[Any, bool]] = None
+
+    def source(self, column):
+        return self.sources.get(column, column)
+
+
+def normalize_trades(df, spec, usd_price_for, scales=None):
+    """
+    Build the canonical trade frame from a raw exchange frame in one pass over each column.
+
+    Numeric columns that already are float64 are used without a copy, fee assets are priced once per distinct asset
+    and the result is assembled directly in canonical column order, so the only copy is the output frame itself.
+    With `scales`, a mapping of the numeric columns to their number of decimals, those columns are parsed into exact
+    int64 values scaled by 10**decimals instead (see `src.processing.fixed_point`).
+    """
+    n = len(df)
+    columns = {}
+    for column in FLOAT_COLUMNS:
+        if scales is not None:
+            columns[column] = fixed_point_column(df, spec, column, scales)
+        elif column in spec.fixed:
+            columns[column] = np.full(n, spec.fixed[column], dtype="float64")
+        elif column == "quoteQty" and spec.quote_from_price:
+            columns[column] = columns["price"] * columns["qty"]
+        else:
+            columns[column] = df[spec.source(column)].to_numpy(dtype="float64")
+
+    if "commissionAsset" in spec.fixed:
+        fee_assets = np.full(n, spec.fixed["commissionAsset"], dtype=object)
+    else:
+        fee_assets = df[spec.source("commissionAsset")].to_numpy()
+    columns["commissionAsset"] = fee_assets
+
+    sides = df[spec.source("side")]
+    if spec.side_values is not None:
+        sides = sides.map(spec.side_values)
+    columns["side"] = sides.to_numpy()
+
+    # fills without a fee asset have no fee price
+    fee_prices = np.full(n, np.nan)
+    for asset in pd.unique(fee_assets):
+        if not pd.isna(asset):
+            fee_prices[fee_assets == asset] = usd_price_for(asset)
+    columns["commissionAssetUsdPrice"] = fee_prices
+
+    times = df[spec.source("date_time")]
+    if spec.time_unit is not None:
+        times = pd.to_datetime(times, unit=spec.time_unit)
+    columns["date_time"] = times.to_numpy()
+
+    if spec.maker_values is not None and spec.source(MAKER_COLUMN) in df:
+        columns[MAKER_COLUMN] = df[spec.source(MAKER_COLUMN)].map(spec.maker_values).to_numpy()
+
+    return pd.DataFrame(columns, index=df.index, copy=False)
@@ -0,0 +1,31 @@
+import threading
+import time
+
+
+class WeightBudget:
+    """
+    Token bucket over an exchange's request weight limit, shared by all threads issuing requests.
+
+    `acquire` blocks until `weight` units are available; the bucket refills continuously at `weight_per_minute`.
+    """
+
+    def __init__(self, weight_per_minute):
+        self.weight_per_minute = weight_per_minute
+        self._available = float(weight_per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._available = min(self.weight_per_minute, self._available + elapsed * self.weight_per_minute / 60)
+        self._updated_at = now
+
+    def acquire(self, weight=1):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._available >= weight:
+                    self._available -= weight
+                    return
+                wait = (weight - self._available) * 60 / self.weight_per_minute
+            time.sleep(wait)
@@ -2,11 +2,34 @@ import time
 
 import pandas as pd
 
-from src.abstract.exchange_client_wrapper import ExchangeClientWrapper
+from src.abstract.conversion_graph import to_float
+from src.abstract.exchange_client_wrapper import ExchangeClientWrapper, NoTradesError
+from src.abstract.httpRequest.columnar import frame_from_records
+from src.abstract.normalization import TradeNormalization
 from src.ascendex.ascendex_rest_api import AscendexRestApi
+from src.processing.fixed_point import decimals_from_increment
 
 
 class AscendexClientWrapper(ExchangeClientWrapper):
+    trade_schema = {
+        "seqNum": "int64",
+        "lastExecTime": "int64",
+        "price": "float64",
+        "orderQty": "float64",
+        "fillQty": "float64",
+        "fee": "float64",
+    }
+    normalization = TradeNormalization(
+        sources={
+            "date_time": "lastExecTime",
+            "qty": "orderQty",
+            "commission": "fee",
+            "commissionAsset": "feeAsset",
+        },
+        side_values={"Buy": "buy", "Sell": "sell"},
+        quote_from_price=True,
+    )
+
     @staticmethod
     def create_instance(api_key, api_secret, api_group):
         api_url = "https://ascendex.com/"
@@ -25,6 +48,17 @@ class AscendexClientWrapper(ExchangeClientWrapper):
                 print("The symbol combination not supported ")
         print("we couldn't find price for this asset")
 
+    def ticker_snapshot(self):
+        snapshot = []
+        for t in self.client.get_ticker():
+            if t["symbol"].count("/") != 1:
+                continue
+            price = to_float(t["close"])
+            # ascendex reports the base volume
+            volume = to_float(t["volume"]) * price if price is not None and t.get("volume") else None
+            snapshot.append((*t["symbol"].split("/"), price, volume))
+        return snapshot
+
     def get_asset_balance(self, asset):
         res = self.client.get_balance(asset=asset)
         if len(res):
@@ -48,13 +82,20 @@ class AscendexClientWrapper(ExchangeClientWrapper):
                 return trading_pair_info["baseAsset"], trading_pair_info["quoteAsset"]
         raise Exception("Trading pair is not valid for ascendex")
 
-    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000), account="cash"):
+    def asset_decimals(self, trading_pair):
+        for r in self.client.list_all_product():
+            if r["symbol"] == trading_pair:
+                price_decimals = decimals_from_increment(r["tickSize"])
+                base_decimals = decimals_from_increment(r["lotSize"])
+                return price_decimals, base_decimals, price_decimals + base_decimals
+        raise Exception("Trading pair is not valid for ascendex")
+
+    def iter_trade_pages(self, symbol, start_date, end_date=round(time.time() * 1000), account="cash"):
         """
-        fetching all orders history filled and opened ones.
+        Yield the filled orders of `symbol` page by page, in fetch order.
 
         to optimize : fetch only filled (not available in api .v2)
         """
-        df_trades = pd.DataFrame()
         seq_num = -1
         while start_date <= end_date:
             rs = None
@@ -82,57 +123,20 @@ class AscendexClientWrapper(ExchangeClientWrapper):
                     continue
                 else:
                     raise Exception(e.args)
-            df_res = pd.DataFrame(rs)
+            df_res = frame_from_records(rs, self.trade_schema)
             if len(df_res) == 0:
                 break
-            elif len(df_trades) == 0:
-                seq_num = df_res.iloc[-1]["seqNum"] + 1
-                df_trades = df_res[df_res["fillQty"] != "0"]
-            else:
-                seq_num = df_res.iloc[-1]["seqNum"] + 1
-                df_res = df_res[df_res["fillQty"] != "0"]
-                df_trades = df_res.append(df_trades, ignore_index=True)
+            seq_num = df_res.iloc[-1]["seqNum"] + 1
+            yield df_res[df_res["fillQty"] != 0]
+
+    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000), account="cash"):
+        """
+        fetching all orders history filled and opened ones.
+        """
+        pages = list(self.iter_trade_pages(symbol, start_date, end_date, account))
+        df_trades = pd.concat(pages[::-1], ignore_index=True) if pages else pd.DataFrame()
         if len(df_trades) > 0:
             df_trades.reset_index(drop=True, inplace=True)
             df_trades.sort_values("lastExecTime", ascending=False, ignore_index=True, inplace=True)
             return self.format_data(df_trades)
-        raise Exception(f"We couldn't fetch trades for this trading pair {symbol}")
-
-    def format_data(self, df):
-        df.loc[(df["side"] == "Sell"), "side"] = "sell"
-        df.loc[(df["side"] == "Buy"), "side"] = "buy"
-
-        df.rename(
-            columns={
-                "lastExecTime": "date_time",
-                "orderQty": "qty",
-                "fee": "commission",
-                "feeAsset": "commissionAsset",
-            },
-            inplace=True,
-        )
-        df["date_time"] = pd.to_datetime(df["date_time"], unit="ms")
-        fee_currencies = df["commissionAsset"].unique()
-        for f in fee_currencies:
-            df.loc[(df["commissionAsset"] == f), "commissionAssetUsdPrice"] = self.usd_price_for(f)
-        df = df.astype(
-            {
-                "price": "float64",
-                "qty": "float64",
-                "commission": "float64",
-                "commissionAssetUsdPrice": "float64",
-            }
-        )
-        df["quoteQty"] = (df.price * df.qty).astype("float64")
-        return df[
-            [
-                "price",
-                "qty",
-                "quoteQty",
-                "commission",
-                "commissionAsset",
-                "side",
-                "commissionAssetUsdPrice",
-                "date_time",
-            ]
-        ]
+        raise NoTradesError(f"We couldn't fetch trades for this trading pair {symbol}")
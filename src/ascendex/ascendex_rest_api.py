@@ -4,18 +4,25 @@ import hmac
 import time
 
 from src.abstract.httpRequest.base_rest_api import BaseRestApi
+from src.abstract.httpRequest.columnar import loads
 
 
 class AscendexRestApi(BaseRestApi):
-    def __init__(self, key, secret, group, url):
-        super().__init__(key=key, secret=secret, url=url)
+    cache_ttls = {
+        "api/pro/v1/ticker": 5,
+        "api/pro/v2/assets": 3600,
+        "api/pro/v1/products": 3600,
+    }
+
+    def __init__(self, key, secret, group, url, response_cache=None):
+        super().__init__(key=key, secret=secret, url=url, response_cache=response_cache)
         self.group = group
 
     @staticmethod
     def check_response_data(response_data):
         if response_data.status_code == 200:
             try:
-                data = response_data.json()
+                data = loads(response_data.content)
             except ValueError:
                 raise Exception(-1, response_data.content)
             else:
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from src.abstract.exchange_client_wrapper import NoTradesError
+from src.abstract.normalization import normalize_trades
+from src.processing import aggregate_trades, merge_aggregates, pnl_from_aggregates
+from src.processing.fixed_point import aggregate_fixed_point, descale_aggregates
+from src.processing.result_cache import default_cache, trades_fingerprint
+
+_DONE = object()
+
+
+@dataclass
+class PipelinedRun:
+    balance: pd.DataFrame
+    meta: Dict[str, Any]
+    df_trades: pd.DataFrame
+    pnl: tuple
+    timings: Dict[str, float] = field(default_factory=dict)
+    agg: Optional[Dict[str, Any]] = None
+
+
+def _fetch_pages(pages, out, timings, started):
+    try:
+        for page in pages:
+            out.put(page)
+        timings["fetch"] = time.time() - started
+        out.put(_DONE)
+    except Exception as e:
+        out.put(e)
+
+
+def _fee_assets(page, spec):
+    if "commissionAsset" in spec.fixed:
+        return [spec.fixed["commissionAsset"]]
+    return [asset for asset in pd.unique(page[spec.source("commissionAsset")]) if not pd.isna(asset)]
+
+
+def _meta(base, quote, base_price, quote_price):
+    return {
+        "base_asset": base,
+        "quote_asset": quote,
+        "quote_asset_price": quote_price,
+        "base_asset_price": base_price,
+    }
+
+
+def pipelined_run(client, trading_pair, start_date, end_date, prefetched_balance=None):
+    """
+    Fetch, price and aggregate the trades of `trading_pair` with every stage overlapping the download.
+
+    Balances and pair prices are requested as soon as the run starts, pages are downloaded by a background thread
+    through the wrapper's `iter_trade_pages`, every fee asset is priced as soon as a page first shows it, and each
+    page is normalized and aggregated while the next ones are still being fetched. Once the last page arrives only
+    the final pnl table remains to be built, so the run takes about as long as the pagination alone.
+
+    Returns a `PipelinedRun` with the same balance, meta, trades (indexed by position) and `pnl_calculate` result as
+    the sequential `get_current_asset_balance`/`get_trades`/`pnl_calculate` steps. A `get_current_asset_balance`
+    result already at hand, or a `Future` of one in flight, can be passed as `prefetched_balance` instead of being
+    requested again.
+    """
+    started = time.time()
+    timings = {}
+    spec = client.normalization
+    scales = client.fixed_point_scales
+    aggregate = aggregate_trades if scales is None else aggregate_fixed_point
+    pages = queue.Queue()
+    with ThreadPoolExecutor(max_workers=client.max_concurrency) as executor:
+        if prefetched_balance is None:
+            prefetched_balance = executor.submit(client.get_current_asset_balance, trading_pair)
+        threading.Thread(
+            target=_fetch_pages,
+            args=(client.iter_trade_pages(trading_pair, start_date, end_date), pages, timings, started),
+            daemon=True,
+        ).start()
+
+        prices = {}
+        frames = []
+        agg = None
+        while True:
+            page = pages.get()
+            if page is _DONE:
+                break
+            if isinstance(page, Exception):
+                raise page
+            if len(page) == 0:
+                continue
+            for asset in _fee_assets(page, spec):
+                if asset not in prices:
+                    # one-call fan_out, so the price request counts against the exchange's concurrency cap
+                    prices[asset] = executor.submit(client.fan_out, [partial(client.price_for, asset)])
+            df_page = normalize_trades(page, spec, lambda asset: prices[asset].result()[0], scales)
+            agg = merge_aggregates(agg, aggregate(df_page))
+            frames.append(df_page)
+
+        if agg is None:
+            raise NoTradesError(f"We couldn't fetch trades for this trading pair {trading_pair}")
+        if isinstance(prefetched_balance, Future):
+            prefetched_balance = prefetched_balance.result()
+        balance, *assets = prefetched_balance
+
+    meta = _meta(*assets)
+    if scales is not None:
+        agg = descale_aggregates(agg, scales)
+    pnl = pnl_from_aggregates(agg, balance, meta)
+    df_trades = pd.concat(frames[::-1], ignore_index=True)
+    timings["total"] = time.time() - started
+    return PipelinedRun(balance=balance, meta=meta, df_trades=df_trades, pnl=pnl, timings=timings, agg=agg)
+
+
+def cached_pipelined_run(client, exchange, trading_pair, start_date, end_date, cache=default_cache):
+    """
+    `pipelined_run` memoized in a `PnlResultCache` with the trades and aggregates it used.
+
+    A cached run of the range is reused once a single page request shows no fill newer than its last one, skipping
+    the download, normalization and aggregation altogether; balances and prices are fetched alongside that request
+    and, when they moved since, only the pnl is rebuilt from the cached aggregates. Without a cached run the balance
+    fetch overlaps the download as in `pipelined_run`.
+    """
+    started = time.time()
+    balance_future = None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+
+        def is_current(trades):
+            nonlocal balance_future
+            balance_future = executor.submit(client.get_current_asset_balance, trading_pair)
+            return not client.has_trades_after(trading_pair, trades[1], end_date)
+
+        cached_key, cached = cache.get_range(exchange, trading_pair, start_date, end_date, is_current)
+        if cached is None:
+            # a stale entry already started the balance fetch, reuse it rather than requesting it twice
+            run = pipelined_run(client, trading_pair, start_date, end_date, balance_future)
+            key = cache.make_key(exchange, trading_pair, start_date, end_date, run.balance, run.meta)
+            cache.put(key, (run.pnl, run.df_trades, run.agg), trades_fingerprint(run.df_trades))
+            return run
+        balance, *assets = balance_future.result()
+    meta = _meta(*assets)
+    key = cache.make_key(exchange, trading_pair, start_date, end_date, balance, meta)
+    pnl, df_trades, agg = cached
+    if cached_key != key:
+        pnl = pnl_from_aggregates(agg, balance, meta)
+        cache.put(key, (pnl, df_trades, agg), trades_fingerprint(df_trades))
+    timings = {"total": time.time() - started}
+    return PipelinedRun(balance=balance, meta=meta, df_trades=df_trades, pnl=pnl, timings=timings, agg=agg)
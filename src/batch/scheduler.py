@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from src.abstract.exchange_factory import create_client
+from src.batch.pipeline import pipelined_run
+from src.processing import pnl_calculate
+
+
+def to_millis(date):
+    return int(pd.Timestamp(date).timestamp() * 1000)
+
+
+@dataclass(order=True)
+class Job:
+    priority: float
+    seq: int
+    name: str = field(compare=False)
+    exchange: str = field(compare=False)
+    account: str = field(compare=False)
+    trading_pair: str = field(compare=False)
+    start_date: int = field(compare=False)
+    end_date: int = field(compare=False)
+    credentials: Dict[str, str] = field(compare=False, repr=False, default_factory=dict)
+    attempts: int = field(compare=False, default=0)
+    not_before: float = field(compare=False, default=0.0)
+
+
+@dataclass
+class JobResult:
+    name: str
+    exchange: str
+    account: str
+    trading_pair: str
+    status: str
+    attempts: int
+    timings: Dict[str, float]
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+def load_manifest(path):
+    """
+    Read a JSON manifest: a list of jobs with `exchange`, `account`, `trading_pair`, `start`, `end` (anything
+    `pd.Timestamp` parses) and the `credentials` passed to the exchange's `create_instance`. `name` and `priority`
+    are optional, the default name being `<account>_<exchange>_<pair>_<start day>-<end day>`. Names key the results
+    and the output files, so they must be unique.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_jobs(manifest):
+    seq = itertools.count()
+    jobs = []
+    names = set()
+    for entry in manifest:
+        start_date = to_millis(entry["start"])
+        end_date = to_millis(entry["end"])
+        name = entry.get("name")
+        if not name:
+            span = f"{pd.Timestamp(start_date, unit='ms'):%Y%m%d}-{pd.Timestamp(end_date, unit='ms'):%Y%m%d}"
+            name = f"{entry['account']}_{entry['exchange']}_{entry['trading_pair']}_{span}".replace("/", "_")
+        if name in names:
+            raise ValueError(f"Duplicate job name {name}, give the manifest entries distinct names")
+        names.add(name)
+        # smaller date ranges are cheaper to fetch, run them first unless the manifest says otherwise
+        priority = entry.get("priority", end_date - start_date)
+        jobs.append(
+            Job(
+                priority=priority,
+                seq=next(seq),
+                name=name,
+                exchange=entry["exchange"],
+                account=entry["account"],
+                trading_pair=entry["trading_pair"],
+                start_date=start_date,
+                end_date=end_date,
+                credentials=entry.get("credentials", {}),
+            )
+        )
+    return jobs
+
+
+def job_payload(pnl, balance):
+    summary, df_summary_table, total_fees_usd, df_commissions = pnl
+    return {
+        "summary": summary,
+        "summary_table": df_summary_table.to_dict(orient="index"),
+        "total_fees_usd": total_fees_usd,
+        "commissions": df_commissions.to_dict(orient="index"),
+        "balance": balance.to_dict(orient="index"),
+    }
+
+
+def run_pnl_job(job):
+    timings = {}
+    started = time.time()
+    client = create_client(job.exchange, **job.credentials)
+    balance, base, quote, base_price, quote_price = client.get_current_asset_balance(job.trading_pair)
+    timings["balance"] = time.time() - started
+
+    started = time.time()
+    df_trades = client.get_trades(job.trading_pair, job.start_date, job.end_date)
+    timings["fetch"] = time.time() - started
+
+    started = time.time()
+    meta = {
+        "base_asset": base,
+        "quote_asset": quote,
+        "quote_asset_price": quote_price,
+        "base_asset_price": base_price,
+    }
+    pnl = pnl_calculate(df_trades, balance, meta)
+    timings["compute"] = time.time() - started
+    return job_payload(pnl, balance), timings
+
+
+def run_pipelined_pnl_job(job):
+    """`run_pnl_job` with fetching, pricing and aggregation overlapped, see `pipelined_run`."""
+    client = create_client(job.exchange, **job.credentials)
+    run = pipelined_run(client, job.trading_pair, job.start_date, job.end_date)
+    return job_payload(run.pnl, run.balance), run.timings
+
+
+class BatchScheduler:
+    """
+    Run many account/exchange/pair/range jobs on one shared worker pool.
+
+    A job only starts when its exchange and its account are both below their concurrency caps, so a slow exchange
+    never holds workers another exchange could use. Pending jobs start smallest first, failed jobs are retried with
+    exponential backoff, and every job's result and timings are written to `output_dir`.
+    """
+
+    def __init__(
+        self,
+        max_workers=16,
+        max_per_exchange=2,
+        max_per_account=1,
+        exchange_limits=None,
+        max_retries=2,
+        retry_delay=5.0,
+        output_dir=None,
+        job_runner=run_pnl_job,
+    ):
+        self.max_workers = max_workers
+        self.max_per_exchange = max_per_exchange
+        self.max_per_account = max_per_account
+        self.exchange_limits = exchange_limits or {}
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.output_dir = output_dir
+        self.job_runner = job_runner
+        self._running_by_exchange = {}
+        self._running_by_account = {}
+
+    def _has_capacity(self, job):
+        exchange_limit = self.exchange_limits.get(job.exchange, self.max_per_exchange)
+        return (
+            self._running_by_exchange.get(job.exchange, 0) < exchange_limit
+            and self._running_by_account.get(job.account, 0) < self.max_per_account
+        )
+
+    def _acquire(self, job, delta=1):
+        self._running_by_exchange[job.exchange] = self._running_by_exchange.get(job.exchange, 0) + delta
+        self._running_by_account[job.account] = self._running_by_account.get(job.account, 0) + delta
+
+    def _run_timed(self, job):
+        started = time.time()
+        result, timings = self.job_runner(job)
+        timings["total"] = time.time() - started
+        return result, timings
+
+    def run(self, jobs):
+        pending = list(jobs)
+        heapq.heapify(pending)
+        running = {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                now = time.time()
+                deferred = []
+                while pending and len(running) < self.max_workers:
+                    job = heapq.heappop(pending)
+                    if job.not_before > now or not self._has_capacity(job):
+                        deferred.append(job)
+                        continue
+                    self._acquire(job)
+                    job.attempts += 1
+                    running[executor.submit(self._run_timed, job)] = job
+                for job in deferred:
+                    heapq.heappush(pending, job)
+
+                if not running:
+                    time.sleep(max(0.0, min(job.not_before for job in pending) - now))
+                    continue
+                next_retry = min((job.not_before for job in pending if job.not_before > now), default=None)
+                timeout = None if next_retry is None else max(0.0, next_retry - now)
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    self._acquire(job, -1)
+                    try:
+                        result, timings = future.result()
+                    except Exception as e:
+                        if job.attempts <= self.max_retries:
+                            print(f"job {job.name} failed ({e}), retrying")
+                            job.not_before = time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+                            heapq.heappush(pending, job)
+                            continue
+                        results[job.name] = self._job_result(job, "failed", {}, error=repr(e))
+                    else:
+                        results[job.name] = self._job_result(job, "done", timings, result=result)
+                    self._write(results[job.name])
+        return results
+
+    @staticmethod
+    def _job_result(job, status, timings, result=None, error=None):
+        return JobResult(
+            name=job.name,
+            exchange=job.exchange,
+            account=job.account,
+            trading_pair=job.trading_pair,
+            status=status,
+            attempts=job.attempts,
+            timings=timings,
+            result=result,
+            error=error,
+        )
+
+    def _write(self, job_result):
+        if self.output_dir is None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, f"{job_result.name}.json"), "w") as f:
+            json.dump(job_result.__dict__, f, indent=2, default=str)
+
+
+def run_manifest(path, **scheduler_kwargs):
+    return BatchScheduler(**scheduler_kwargs).run(build_jobs(load_manifest(path)))
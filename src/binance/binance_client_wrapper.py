@@ -1,15 +1,44 @@
 import json
+import os
 import time
+from functools import partial
 
 import pandas as pd
 import requests
 
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
-from src.abstract.exchange_client_wrapper import ExchangeClientWrapper
+from src.abstract.conversion_graph import to_float
+from src.abstract.exchange_client_wrapper import ExchangeClientWrapper, NoTradesError
+from src.abstract.httpRequest.columnar import frame_from_records
+from src.abstract.normalization import TradeNormalization
+from src.abstract.rate_limit import WeightBudget
+
+# request weights of the endpoints used for account-wide discovery
+MY_TRADES_WEIGHT = 10
+ACCOUNT_WEIGHT = 10
+EXCHANGE_INFO_WEIGHT = 10
+ALL_TICKERS_WEIGHT = 40
 
 
 class BinanceClientWrapper(ExchangeClientWrapper):
+    # deep book, even minor listed pairs trade far more than this
+    conversion_min_volume = 100_000
+    trade_schema = {
+        "time": "int64",
+        "price": "float64",
+        "qty": "float64",
+        "quoteQty": "float64",
+        "commission": "float64",
+    }
+    normalization = TradeNormalization(
+        sources={"date_time": "time", "side": "isBuyer"},
+        side_values={True: "buy", False: "sell"},
+        maker_values={True: True, False: False},
+    )
+    # binance allows 1200 weight per minute and ip, leave headroom for the rest of the process
+    weight_budget = WeightBudget(1000)
+
     @staticmethod
     def create_instance(api_key, api_secret):
         binance_client = Client(api_key, api_secret)
@@ -32,6 +61,16 @@ class BinanceClientWrapper(ExchangeClientWrapper):
 
         raise Exception("we couldn't find price for this asset")
 
+    def ticker_snapshot(self):
+        self.weight_budget.acquire(EXCHANGE_INFO_WEIGHT)
+        symbols = {s["symbol"]: (s["baseAsset"], s["quoteAsset"]) for s in self.client.get_exchange_info()["symbols"]}
+        self.weight_budget.acquire(ALL_TICKERS_WEIGHT)
+        return [
+            (*symbols[t["symbol"]], to_float(t["lastPrice"]), to_float(t["quoteVolume"]))
+            for t in self.client.get_ticker()
+            if t["symbol"] in symbols
+        ]
+
     def get_asset_balance(self, asset):
         """Give an asset return balance locked or free to use."""
         balances = self.client.get_asset_balance(asset)
@@ -46,61 +85,101 @@ class BinanceClientWrapper(ExchangeClientWrapper):
             return base_asset, quote_asset
         raise Exception("Trading pair is not valid for binance")
 
-    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
-        df_trades = pd.DataFrame()
+    def asset_decimals(self, trading_pair):
+        trading_pair_info = self.client.get_symbol_info(trading_pair)
+        if trading_pair_info:
+            quote_decimals = trading_pair_info["quoteAssetPrecision"]
+            return quote_decimals, trading_pair_info["baseAssetPrecision"], quote_decimals
+        raise Exception("Trading pair is not valid for binance")
+
+    def iter_trade_pages(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        """Yield the raw trade pages of `symbol` in fetch order, oldest page first and each page newest first."""
         while start_date <= end_date:
             try:
-                df_res = pd.DataFrame(self.client.get_my_trades(symbol=symbol, startTime=start_date))
-                if len(df_res) == 0 or df_res.empty:
-                    break
-                elif len(df_trades) == 0:
-                    start_date = df_res.iloc[-1]["time"] + 1
-                    df_trades = df_res[df_res["time"] <= end_date].sort_values(
-                        "time", ascending=False, ignore_index=True
-                    )
-                else:
-                    start_date = df_res.iloc[-1]["time"] + 1
-                    df_res = df_res[df_res["time"] <= end_date].sort_values("time", ascending=False, ignore_index=True)
-                    df_trades = pd.concat([df_res, df_trades])
+                self.weight_budget.acquire(MY_TRADES_WEIGHT)
+                df_res = frame_from_records(
+                    self.client.get_my_trades(symbol=symbol, startTime=start_date), self.trade_schema
+                )
             except BinanceAPIException as err:
                 if err.code == -1003:
                     print("exceed limit rate sleep for 1min 💤")
                     time.sleep(61)
+                continue
+            if len(df_res) == 0 or df_res.empty:
+                break
+            start_date = df_res.iloc[-1]["time"] + 1
+            yield df_res[df_res["time"] <= end_date].sort_values("time", ascending=False, ignore_index=True)
 
+    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        pages = list(self.iter_trade_pages(symbol, start_date, end_date))
+        df_trades = pd.concat(pages[::-1]) if pages else pd.DataFrame()
         if len(df_trades) == 0:
-            raise Exception(f"We couldn't fetch trades for this trading pair {symbol}")
-        df_trades["date_time"] = pd.to_datetime(df_trades["time"], unit="ms")
+            raise NoTradesError(f"We couldn't fetch trades for this trading pair {symbol}")
         df_trades.set_index("id", inplace=True, drop=True)
-        float_columns = ["price", "qty", "quoteQty", "commission"]
-        df_trades[float_columns] = df_trades[float_columns].apply(pd.to_numeric)
         return self.format_data(df_trades)
 
-    def format_data(self, df):
-        print(df)
-        print(df["isBuyer"])
-        df.rename(columns={"isBuyer": "side"}, inplace=True)
-        
-        fee_currencies = df["commissionAsset"].unique()
-        for f in fee_currencies:
-            df.loc[(df["commissionAsset"] == f), "commissionAssetUsdPrice"] = self.usd_price_for(f)
-        df = df.astype(
-            {
-                "price": "float64",
-                "qty": "float64",
-                "quoteQty": "float64",
-                "commission": "float64",
-                "commissionAssetUsdPrice": "float64",
-            }
-        )
-        return df[
-            [
-                "price",
-                "qty",
-                "quoteQty",
-                "commission",
-                "commissionAsset",
-                "side",
-                "commissionAssetUsdPrice",
-                "date_time",
-            ]
-        ]
+    @staticmethod
+    def load_known_pairs(path):
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return set(json.load(f))
+        return set()
+
+    @staticmethod
+    def save_known_pairs(path, pairs):
+        with open(path, "w") as f:
+            json.dump(sorted(pairs), f)
+
+    def candidate_symbols(self, known_pairs=(), seed_pairs=()):
+        """
+        Narrow the exchange's symbols to the ones the account plausibly traded: trading pairs whose base asset is
+        currently held, plus pairs already known to have been traded and the caller's `seed_pairs`.
+
+        Quote assets are not used, holding USDT or BTC would make most of the exchange a candidate. A position closed
+        entirely (e.g. all ETH sold to USDT) is therefore only found once it is in `known_pairs`, so pass such pairs
+        as `seed_pairs` on a first run.
+        """
+        self.weight_budget.acquire(ACCOUNT_WEIGHT)
+        balances = self.client.get_account()["balances"]
+        held = {b["asset"] for b in balances if float(b["free"]) + float(b["locked"]) > 0}
+        self.weight_budget.acquire(EXCHANGE_INFO_WEIGHT)
+        symbols = self.client.get_exchange_info()["symbols"]
+        candidates = {s["symbol"] for s in symbols if s["status"] == "TRADING" and s["baseAsset"] in held}
+        return sorted(candidates | set(known_pairs) | set(seed_pairs))
+
+    def _last_trade_time(self, symbol):
+        self.weight_budget.acquire(MY_TRADES_WEIGHT)
+        try:
+            trades = self.client.get_my_trades(symbol=symbol, limit=1)
+        except BinanceAPIException:
+            return None
+        return trades[-1]["time"] if trades else None
+
+    def traded_symbols(self, start_date, known_pairs=(), seed_pairs=()):
+        """Probe every candidate with a single-trade request and keep the ones with a fill after `start_date`."""
+        candidates = self.candidate_symbols(known_pairs, seed_pairs)
+        last_times = self.fan_out([partial(self._last_trade_time, symbol) for symbol in candidates])
+        return [symbol for symbol, last in zip(candidates, last_times) if last is not None and last >= start_date]
+
+    def _get_trades_or_none(self, symbol, start_date, end_date):
+        try:
+            return self.get_trades(symbol, start_date, end_date)
+        except NoTradesError:
+            return None
+
+    def get_account_trades(self, start_date, end_date=None, known_pairs_path=None, seed_pairs=()):
+        """
+        Fetch the trades of every pair the account traded between `start_date` and `end_date`.
+
+        Full histories of the active pairs are pulled in parallel within the shared weight budget. Pairs found to be
+        traded are remembered in `known_pairs_path` so later runs probe them even once the asset is no longer held;
+        `seed_pairs` adds pairs to probe that neither the balances nor `known_pairs_path` point at.
+        """
+        end_date = end_date or round(time.time() * 1000)
+        known_pairs = self.load_known_pairs(known_pairs_path)
+        symbols = self.traded_symbols(start_date, known_pairs, seed_pairs)
+        frames = self.fan_out([partial(self._get_trades_or_none, symbol, start_date, end_date) for symbol in symbols])
+        trades = {symbol: df for symbol, df in zip(symbols, frames) if df is not None}
+        if known_pairs_path:
+            self.save_known_pairs(known_pairs_path, known_pairs | set(trades))
+        return trades
@@ -4,6 +4,7 @@ import hmac
 import time
 
 from src.abstract.httpRequest.base_rest_api import BaseRestApi
+from src.abstract.httpRequest.columnar import loads
 import src.btc_markets.btc_markets_constants as CONSTANTS
 
 
@@ -12,8 +13,14 @@ class BtcMarketsClient(BaseRestApi):
     Auth class required by btc_markets API
     Learn more at https://api.btcmarkets.net/doc/v3#section/Authentication/Authentication-process
     """
-    def __init__(self, api_key: str, secret_key: str, url):
-        super().__init__(key=api_key, secret=secret_key, url=url)
+    cache_ttls = {
+        f"{CONSTANTS.TICKER_URL}/*/ticker": 5,
+        f"{CONSTANTS.TICKER_URL}/tickers?*": 5,
+        CONSTANTS.MARKETS_URL: 3600,
+    }
+
+    def __init__(self, api_key: str, secret_key: str, url, response_cache=None):
+        super().__init__(key=api_key, secret=secret_key, url=url, response_cache=response_cache)
 
     def get_path_from_url(url: str) -> str:
         return url.replace(CONSTANTS.REST_URLS, '')
@@ -22,7 +29,7 @@ class BtcMarketsClient(BaseRestApi):
     def check_response_data(response_data):
         if response_data.status_code == 200:
             try:
-                data = response_data.json()
+                data = loads(response_data.content)
             except ValueError:
                 raise Exception(-1, response_data.content)
             else:
@@ -71,6 +78,11 @@ class BtcMarketsClient(BaseRestApi):
 
         return self._request("GET", path, params=params, auth=False)
     
+    def get_tickers(self, market_ids):
+        # the market ids are repeated query parameters, which `_request` params cannot express
+        query = "&".join(f"marketId={market_id}" for market_id in market_ids)
+        return self._request("GET", f"{CONSTANTS.TICKER_URL}/tickers?{query}", auth=False)
+
     def list_asset(self, **kwargs):
         params = {}
         if kwargs:
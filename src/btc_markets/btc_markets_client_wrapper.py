@@ -4,11 +4,28 @@ import pandas as pd
 from datetime import datetime as dt
 
 from src.btc_markets.btc_markets_client import BtcMarketsClient
-from src.abstract.exchange_client_wrapper import ExchangeClientWrapper
+from src.abstract.conversion_graph import to_float
+from src.abstract.exchange_client_wrapper import ExchangeClientWrapper, NoTradesError
+from src.abstract.httpRequest.columnar import frame_from_records
+from src.abstract.normalization import TradeNormalization
 import src.btc_markets.btc_markets_constants as CONSTANTS
 
 
 class BTCMarketsClientWrapper(ExchangeClientWrapper):
+    balance_index = "marketId"
+    valuation_currency = "AUD"
+    conversion_pegs = {}
+    # small AUD book, a higher floor would drop most of its markets
+    conversion_min_volume = 1_000
+    trade_schema = {"timestamp": "float64", "price": "float64", "amount": "float64", "fee": "float64"}
+    normalization = TradeNormalization(
+        sources={"date_time": "timestamp", "qty": "amount", "commission": "fee"},
+        side_values={"Bid": "buy", "Ask": "sell"},
+        fixed={"commissionAsset": "AUD"},
+        time_unit="s",
+        quote_from_price=True,
+    )
+
     @staticmethod
     def create_instance(api_key, api_secret):
         btc_markets_client = BtcMarketsClient(api_key, api_secret, CONSTANTS.REST_URLS)
@@ -24,17 +41,16 @@ class BTCMarketsClientWrapper(ExchangeClientWrapper):
         except Exception:
             raise Exception("we couldn't find price for this asset")
         
-    def get_current_asset_balance(self, trading_pair):
-        base_asset, quote_asset = self.symbol_info(trading_pair)
-        df = pd.DataFrame(columns=["marketId"], data=[base_asset, quote_asset])
-        df["price"] = df["marketId"].apply(lambda x: self.usd_price_for(x))
-        df["balance"] = df["marketId"].apply(lambda x: self.get_asset_balance(x))
-        df["quote_value"] = df["price"] * df["balance"]
-        df.set_index("marketId", inplace=True, drop=True)
-        base_asset_price = df.at[base_asset, "price"]
-        quote_asset_price = df.at[quote_asset, "price"]
-        return df, base_asset, quote_asset, base_asset_price, quote_asset_price
-            
+    def ticker_snapshot(self):
+        market_ids = [m["marketId"] for m in self.client.list_asset()]
+        snapshot = []
+        for t in self.client.get_tickers(market_ids):
+            price = to_float(t["lastPrice"])
+            # btc markets reports the base volume
+            volume = to_float(t["volume24h"]) * price if price is not None and t.get("volume24h") else None
+            snapshot.append((*t["marketId"].split("-"), price, volume))
+        return snapshot
+
     def get_asset_balance(self, asset):
         res = self.client.get_balance()
 
@@ -62,9 +78,16 @@ class BTCMarketsClientWrapper(ExchangeClientWrapper):
                 return trading_pair_info["baseAssetName"], trading_pair_info["quoteAssetName"]
         raise Exception("Trading pair is not valid for btc markets")
 
-    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
-        df_trades = pd.DataFrame()
-        pd.set_option('max_columns', None)
+    def asset_decimals(self, trading_pair):
+        for r in self.client.list_asset():
+            if r["marketId"] == trading_pair:
+                price_decimals = int(r["priceDecimals"])
+                base_decimals = int(r["amountDecimals"])
+                return price_decimals, base_decimals, price_decimals + base_decimals
+        raise Exception("Trading pair is not valid for btc markets")
+
+    def iter_trade_pages(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        """Yield the raw trade pages of `symbol` in fetch order."""
         start_date = round(start_date / 1000)
         end_date = round(end_date / 1000)
         #while start_date <= end_date:
@@ -79,68 +102,25 @@ class BTCMarketsClientWrapper(ExchangeClientWrapper):
                     dt_object = dt.strptime(trade["timestamp"], "%Y-%m-%dT%H:%M:%S.%f000Z")
                     trade["timestamp"] = dt.timestamp(dt_object) #round(float(trade["timestamp"].strptime("%Y-%m-%dT%H:%M:%S.%f000Z")))
             
-                df_res = pd.DataFrame(trades)
-
-                #if len(df_res) == 0:
-                #    break
-                if len(df_trades) == 0:
-                    start_date = int(df_res.iloc[0]["timestamp"]) + 1
-                    df_trades = df_res[df_res["timestamp"] <= end_date]
-                else:
-                    start_date = int(df_res.iloc[0]["timestamp"]) + 1
-                    df_res = df_res[df_res["timestamp"] <= end_date]
-                    df_trades = df_res.append(df_trades, ignore_index=True)
+                df_res = frame_from_records(trades, self.trade_schema)
             except Exception as err:
                 if err.code == -1003:
                     print("exceed limit rate sleep for 1min 💤")
                     time.sleep(61)
                 else:
                     print(f"error connecting to the exchange {err}")
+                return
 
-        if len(df_trades) == 0:
-            raise Exception(f"We couldn't fetch trades for this trading pair {symbol}")
-        df_trades["date_time"] = pd.to_datetime(df_trades["timestamp"], unit="ms")
-
-        df_trades.rename(
-            columns={
-                "amount": "qty",
-                "valueInQuoteAsset": "commissionAssetUsdPrice",
-                "fee": "commission"
-            },
-            inplace=True,
-        )
+            if len(df_res) == 0:
+                return
+            yield df_res[df_res["timestamp"] <= end_date]
 
-        df_trades["quoteQty"] = 1
-        df_trades["commissionAsset"] = "AUD"
+    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        pd.set_option('max_columns', None)
+        pages = list(self.iter_trade_pages(symbol, start_date, end_date))
+        df_trades = pd.concat(pages[::-1], ignore_index=True) if pages else pd.DataFrame()
 
+        if len(df_trades) == 0:
+            raise NoTradesError(f"We couldn't fetch trades for this trading pair {symbol}")
         df_trades.set_index("id", inplace=True, drop=True)
-        #float_columns = ["price", "amount", "valueInQuoteAsset"]
-        float_columns = ["price", "qty", "quoteQty", "commission"]
-        df_trades[float_columns] = df_trades[float_columns].apply(pd.to_numeric)
         return self.format_data(df_trades)
-
-    def format_data(self, df):
-        df.loc[(df["side"] == "Ask"), "side"] = "sell"
-        df.loc[(df["side"] == "Bid"), "side"] = "buy"
-
-        df = df.astype(
-            {
-                "price": "float64",
-                "qty": "float64",
-                "quoteQty": "float64",
-                "commission": "float64",
-                "commissionAssetUsdPrice": "float64",
-            }
-        )
-        return df[
-            [
-                "price",
-                "qty",
-                "quoteQty",
-                "commission",
-                "commissionAsset",
-                "side",
-                "commissionAssetUsdPrice",
-                "date_time",
-            ]
-        ]
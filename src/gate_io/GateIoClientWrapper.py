@@ -4,10 +4,32 @@ import pandas as pd
 from gate_api import ApiClient, Configuration, SpotApi
 from gate_api.exceptions import ApiException, GateApiException
 
-from src.abstract.exchange_client_wrapper import ExchangeClientWrapper
+from src.abstract.conversion_graph import to_float
+from src.abstract.exchange_client_wrapper import ExchangeClientWrapper, NoTradesError
+from src.abstract.httpRequest.columnar import frame_from_records
+from src.abstract.normalization import TradeNormalization
 
 
 class GateIoClientWrapper(ExchangeClientWrapper):
+    trade_schema = {
+        "create_time": "int64",
+        "create_time_ms": "int64",
+        "price": "float64",
+        "amount": "float64",
+        "fee": "float64",
+    }
+    normalization = TradeNormalization(
+        sources={
+            "date_time": "create_time_ms",
+            "qty": "amount",
+            "commission": "fee",
+            "commissionAsset": "fee_currency",
+            "isMaker": "role",
+        },
+        quote_from_price=True,
+        maker_values={"maker": True, "taker": False},
+    )
+
     def __init__(self, gate_io_client, gate_io_spot):
         super().__init__(gate_io_client)
         self.spotClient = gate_io_spot
@@ -36,6 +58,12 @@ class GateIoClientWrapper(ExchangeClientWrapper):
                 print("The symbol combination not supported ")
         print("we couldn't find price for this asset")
 
+    def ticker_snapshot(self):
+        return [
+            (*t.currency_pair.split("_"), to_float(t.last), to_float(t.quote_volume))
+            for t in self.spotClient.list_tickers()
+        ]
+
     def get_asset_balance(self, asset):
         try:
             # List spot accounts
@@ -60,70 +88,44 @@ class GateIoClientWrapper(ExchangeClientWrapper):
         except ApiException as e:
             print("Exception when calling SpotApi->list_currency_pairs: %s\n" % e)
 
-    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
-        df_trades = pd.DataFrame()
+    def asset_decimals(self, trading_pair):
+        for r in self.spotClient.list_currency_pairs():
+            if r.id == trading_pair:
+                return r.precision, r.amount_precision, r.precision + r.amount_precision
+        raise Exception("Trading pair is not valid for gateio")
+
+    def iter_trade_pages(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        """Yield the raw trade pages of `symbol` in fetch order."""
         start_date = round(start_date / 1000)
         end_date = round(end_date / 1000)
         while start_date <= end_date:
             try:
                 trades = self.spotClient.list_my_trades(symbol, limit=500, _from=start_date, to=end_date)
-
-                trades = [trade.to_dict() for trade in trades]
-                for trade in trades:
-                    trade["create_time"] = int(trade["create_time"])
-                    trade["create_time_ms"] = round(float(trade["create_time_ms"]))
-
-                df_res = pd.DataFrame(trades)
-
-                if len(df_res) == 0:
-                    break
-                elif len(df_trades) == 0:
-                    start_date = int(df_res.iloc[0]["create_time"]) + 1
-                    df_trades = df_res[df_res["create_time"] <= end_date]
-                else:
-                    start_date = int(df_res.iloc[0]["create_time"]) + 1
-                    df_res = df_res[df_res["create_time"] <= end_date]
-                    df_trades = df_res.append(df_trades, ignore_index=True)
-
             except GateApiException as ex:
                 print("Gate api exception, label: %s, message: %s\n" % (ex.label, ex.message))
+                continue
             except ApiException as e:
                 print("Exception when calling SpotApi->list_my_trades: %s\n" % e)
+                continue
+
+            trades = [trade.to_dict() for trade in trades]
+            for trade in trades:
+                trade["create_time"] = int(trade["create_time"])
+                trade["create_time_ms"] = round(float(trade["create_time_ms"]))
+
+            df_res = frame_from_records(trades, self.trade_schema)
+
+            if len(df_res) == 0:
+                break
+            start_date = int(df_res.iloc[0]["create_time"]) + 1
+            yield df_res[df_res["create_time"] <= end_date]
+
+    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        pages = list(self.iter_trade_pages(symbol, start_date, end_date))
+        df_trades = pd.concat(pages[::-1], ignore_index=True) if pages else pd.DataFrame()
 
         if len(df_trades) == 0:
-            raise Exception(f"We couldn't fetch trades for this trading pair {symbol}")
+            raise NoTradesError(f"We couldn't fetch trades for this trading pair {symbol}")
 
-        df_trades["date_time"] = pd.to_datetime(df_trades["create_time_ms"], unit="ms")
         df_trades.set_index("id", inplace=True, drop=True)
-        float_columns = ["price", "amount", "fee"]
-        df_trades[float_columns] = df_trades[float_columns].apply(pd.to_numeric)
         return self.format_data(df_trades)
-
-    def format_data(self, df):
-        df.rename(
-            columns={
-                "amount": "qty",
-                "fee": "commission",
-                "fee_currency": "commissionAsset",
-            },
-            inplace=True,
-        )
-        fee_currencies = df["commissionAsset"].unique()
-        for f in fee_currencies:
-            df.loc[(df["commissionAsset"] == f), "commissionAssetUsdPrice"] = self.usd_price_for(f)
-        df = df.astype(
-            {"price": "float64", "qty": "float64", "commission": "float64", "commissionAssetUsdPrice": "float64"}
-        )
-        df["quoteQty"] = (df.price * df.qty).astype("float64")
-        return df[
-            [
-                "price",
-                "qty",
-                "quoteQty",
-                "commission",
-                "commissionAsset",
-                "side",
-                "commissionAssetUsdPrice",
-                "date_time",
-            ]
-        ]
@@ -4,10 +4,33 @@ import pandas as pd
 
 from kucoin.client import Market, Trade
 from kucoin.client import User as Client
-from src.abstract.exchange_client_wrapper import ExchangeClientWrapper
+from src.abstract.conversion_graph import to_float
+from src.abstract.exchange_client_wrapper import ExchangeClientWrapper, NoTradesError
+from src.abstract.httpRequest.columnar import frame_from_records
+from src.abstract.normalization import TradeNormalization
+from src.processing.fixed_point import decimals_from_increment
 
 
 class KucoinClientWrapper(ExchangeClientWrapper):
+    trade_schema = {
+        "createdAt": "int64",
+        "price": "float64",
+        "size": "float64",
+        "funds": "float64",
+        "fee": "float64",
+    }
+    normalization = TradeNormalization(
+        sources={
+            "date_time": "createdAt",
+            "qty": "size",
+            "quoteQty": "funds",
+            "commission": "fee",
+            "commissionAsset": "feeCurrency",
+            "isMaker": "liquidity",
+        },
+        maker_values={"maker": True, "taker": False},
+    )
+
     def __init__(self, kucoin_client, kucoin_trade, kucoin_market):
         super().__init__(kucoin_client)
         self.marketClient = kucoin_market
@@ -32,6 +55,10 @@ class KucoinClientWrapper(ExchangeClientWrapper):
                 """The symbol combination not supported."""
         print("we couldn't find price for this asset")
 
+    def ticker_snapshot(self):
+        tickers = self.marketClient.get_all_tickers()["ticker"]
+        return [(*t["symbol"].split("-"), to_float(t["last"]), to_float(t["volValue"])) for t in tickers]
+
     def get_asset_balance(self, asset):
         """Give an asset return balance locked or free to use."""
         res = self.client.get_account_list(asset)
@@ -54,57 +81,29 @@ class KucoinClientWrapper(ExchangeClientWrapper):
                 )
         raise Exception("Trading pair is not valid for kucoin")
 
-    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
-        df_trades = pd.DataFrame()
+    def asset_decimals(self, trading_pair):
+        for r in self.marketClient.get_symbol_list():
+            if r["symbol"] == trading_pair:
+                price_decimals = decimals_from_increment(r["priceIncrement"])
+                base_decimals = decimals_from_increment(r["baseIncrement"])
+                # funds are price * size, unrounded
+                return price_decimals, base_decimals, price_decimals + base_decimals
+        raise Exception("Trading pair is not valid for kucoin")
+
+    def iter_trade_pages(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        """Yield the raw trade pages of `symbol` in fetch order."""
         while start_date <= end_date:
             rs = self.tradeClient.get_fill_list("TRADE", symbol=symbol, pageSize=500, startAt=start_date)
-            df_res = pd.DataFrame(rs["items"])
+            df_res = frame_from_records(rs["items"], self.trade_schema)
             if len(df_res) == 0:
                 break
-            elif len(df_trades) == 0:
-                start_date = df_res.iloc[0]["createdAt"] + 1
-                df_trades = df_res[df_res["createdAt"] <= end_date]
-            else:
-                start_date = df_res.iloc[0]["createdAt"] + 1
-                df_res = df_res[df_res["createdAt"] <= end_date]
-                df_trades = df_res.append(df_trades, ignore_index=True)
+            start_date = df_res.iloc[0]["createdAt"] + 1
+            yield df_res[df_res["createdAt"] <= end_date]
+
+    def get_trades(self, symbol, start_date, end_date=round(time.time() * 1000)):
+        pages = list(self.iter_trade_pages(symbol, start_date, end_date))
+        df_trades = pd.concat(pages[::-1], ignore_index=True) if pages else pd.DataFrame()
         if len(df_trades) > 0:
             df_trades.reset_index(drop=True, inplace=True)
             return self.format_data(df_trades)
-        raise Exception(f"We couldn't fetch trades for this trading pair {symbol}")
-
-    def format_data(self, df):
-        df.rename(
-            columns={
-                "size": "qty",
-                "funds": "quoteQty",
-                "fee": "commission",
-                "feeCurrency": "commissionAsset",
-            },
-            inplace=True,
-        )
-        df["date_time"] = pd.to_datetime(df["createdAt"], unit="ms")
-        fee_currencies = df["commissionAsset"].unique()
-        for f in fee_currencies:
-            df.loc[(df["commissionAsset"] == f), "commissionAssetUsdPrice"] = self.usd_price_for(f)
-        df = df.astype(
-            {
-                "price": "float64",
-                "qty": "float64",
-                "quoteQty": "float64",
-                "commission": "float64",
-                "commissionAssetUsdPrice": "float64",
-            }
-        )
-        return df[
-            [
-                "price",
-                "qty",
-                "quoteQty",
-                "commission",
-                "commissionAsset",
-                "side",
-                "commissionAssetUsdPrice",
-                "date_time",
-            ]
-        ]
+        raise NoTradesError(f"We couldn't fetch trades for this trading pair {symbol}")
@@ -1,25 +1,72 @@
 import pandas as pd
 
 
+def aggregate_trades(df):
+    """
+    Reduce a normalized trade frame to the partial sums, counts and bounds `pnl_calculate` needs.
+
+    Aggregates of disjoint chunks of trades can be combined with `merge_aggregates`.
+    """
+    df_buys = df[df["side"] == "buy"]
+    df_sells = df[df["side"] == "sell"]
+    df_commissions = df.groupby(["commissionAsset"]).agg({"commission": sum, "commissionAssetUsdPrice": "first"})
+    return {
+        "num_trades": len(df),
+        "num_buys": len(df_buys),
+        "num_sells": len(df_sells),
+        "base_buys": df_buys["qty"].sum(),
+        "base_sells": df_sells["qty"].sum(),
+        "quote_proceeds": df_sells["quoteQty"].sum(),
+        "quote_spent": df_buys["quoteQty"].sum(),
+        "base_traded": df["qty"].sum(),
+        "quote_traded": df["quoteQty"].sum(),
+        "first_trade": df["date_time"].min(),
+        "last_trade": df["date_time"].max(),
+        "commissions": {
+            asset: [row["commission"], row["commissionAssetUsdPrice"]] for asset, row in df_commissions.iterrows()
+        },
+    }
+
+
+def merge_aggregates(left, right):
+    if left is None or left["num_trades"] == 0:
+        return right
+    if right["num_trades"] == 0:
+        return left
+    merged = {key: left[key] + right[key] for key in left if key not in ["first_trade", "last_trade", "commissions"]}
+    merged["first_trade"] = min(left["first_trade"], right["first_trade"])
+    merged["last_trade"] = max(left["last_trade"], right["last_trade"])
+    commissions = {asset: list(values) for asset, values in left["commissions"].items()}
+    for asset, (amount, price) in right["commissions"].items():
+        if asset in commissions:
+            commissions[asset][0] += amount
+        else:
+            commissions[asset] = [amount, price]
+    merged["commissions"] = commissions
+    return merged
+
+
 def pnl_calculate(df, current_balance, meta):
+    return pnl_from_aggregates(aggregate_trades(df), current_balance, meta)
+
+
+def pnl_from_aggregates(agg, current_balance, meta):
     total_balance_usd = current_balance["quote_value"].sum()
     base_asset = meta["base_asset"]
     quote_asset = meta["quote_asset"]
     base_asset_price = meta["base_asset_price"]
     quote_asset_price = meta["quote_asset_price"]
-    df_buys = df[df["side"] == "buy"]
-    df_sells = df[df["side"] == "sell"]
 
-    num_trades = len(df)
-    num_buys = len(df_buys)
-    num_sells = len(df_sells)
+    num_trades = agg["num_trades"]
+    num_buys = agg["num_buys"]
+    num_sells = agg["num_sells"]
 
     columns = ["Label", f"Base ({base_asset})", f"Quote ({quote_asset})", "Total"]
 
-    base_buys = df_buys["qty"].sum()
-    base_sells = df_sells["qty"].sum()
-    quote_proceeds = df_sells["quoteQty"].sum()
-    quote_spent = df_buys["quoteQty"].sum()
+    base_buys = agg["base_buys"]
+    base_sells = agg["base_sells"]
+    quote_proceeds = agg["quote_proceeds"]
+    quote_spent = agg["quote_spent"]
 
     base_delta = base_buys - base_sells
     quote_delta = quote_proceeds - quote_spent
@@ -30,7 +77,8 @@ def pnl_calculate(df, current_balance, meta):
     trade_pnl = base_delta_usd + quote_delta_usd
 
     # Calculate trading fees
-    total_fees_usd, df_commissions = calc_trading_fees(df)
+    df_commissions = commissions_frame(agg["commissions"])
+    total_fees_usd = fees_usd(df_commissions)
 
     net_pnl = trade_pnl - total_fees_usd
 
@@ -53,28 +101,39 @@ def pnl_calculate(df, current_balance, meta):
     df_summary_table.set_index("Label", inplace=True, drop=True)
 
     summary = {
-        "first trade": df["date_time"].min().replace(microsecond=0),
-        "last trade": df["date_time"].max().replace(microsecond=0),
+        "first trade": agg["first_trade"].replace(microsecond=0),
+        "last trade": agg["last_trade"].replace(microsecond=0),
         "total trades": num_trades,
         "- buys": f"{num_buys} / {num_buys/num_trades:.1%}",
         "- sells": f"{num_sells} / {num_sells/num_trades:.1%}",
-        "total base traded": f"{df['qty'].sum():,.0f}",
-        "total quote traded": f"{df['quoteQty'].sum():,.0f}",
-        "approx. quote volume": f"${df['qty'].sum() * base_asset_price:,.0f}",
+        "total base traded": f"{agg['base_traded']:,.0f}",
+        "total quote traded": f"{agg['quote_traded']:,.0f}",
+        "approx. quote volume": f"${agg['base_traded'] * base_asset_price:,.0f}",
     }
 
     return summary, df_summary_table, total_fees_usd, df_commissions
 
 
-def calc_trading_fees(df):
-    total_fees_usd = 0
+def commissions_frame(commissions):
+    df_commissions = pd.DataFrame(
+        data=[values for values in commissions.values()],
+        index=pd.Index(list(commissions.keys()), name="commissionAsset"),
+        columns=["commission", "commissionAssetUsdPrice"],
+    )
+    return df_commissions.sort_index()
 
-    df_commissions = df.groupby(["commissionAsset"]).agg({"commission": sum, "commissionAssetUsdPrice": "first"})
+
+def fees_usd(df_commissions):
+    total_fees_usd = 0
 
     for asset in df_commissions.index:
         amount = df_commissions.loc[asset]["commission"]
         price = df_commissions.loc[asset]["commissionAssetUsdPrice"]
-        fees_usd = amount * price
-        total_fees_usd += fees_usd
+        total_fees_usd += amount * price
+
+    return total_fees_usd
+
 
-    return total_fees_usd, df_commissions
+def calc_trading_fees(df):
+    df_commissions = df.groupby(["commissionAsset"]).agg({"commission": sum, "commissionAssetUsdPrice": "first"})
+    return fees_usd(df_commissions), df_commissions
@@ -0,0 +1,35 @@
+from src.processing import aggregate_trades, commissions_frame, fees_usd, merge_aggregates, pnl_from_aggregates
+
+# rough in-memory footprint of one normalized trade row while a CSV chunk is parsed and aggregated
+ESTIMATED_BYTES_PER_ROW = 512
+
+
+def chunk_rows_for(max_memory_bytes):
+    return max(1, int(max_memory_bytes // ESTIMATED_BYTES_PER_ROW))
+
+
+def aggregate_chunks(chunks):
+    agg = None
+    for chunk in chunks:
+        agg = merge_aggregates(agg, aggregate_trades(chunk))
+    if agg is None:
+        raise Exception("No trades to aggregate")
+    return agg
+
+
+def chunked_pnl_calculate(chunks, current_balance, meta):
+    """Same as `pnl_calculate`, over an iterable of trade frames that are aggregated one at a time."""
+    return pnl_from_aggregates(aggregate_chunks(chunks), current_balance, meta)
+
+
+def chunked_trading_fees(chunks):
+    df_commissions = commissions_frame(aggregate_chunks(chunks)["commissions"])
+    return fees_usd(df_commissions), df_commissions
+
+
+def store_pnl_calculate(
+    store, exchange, symbol, current_balance, meta, start=None, end=None, max_memory_bytes=256 * 1024 * 1024
+):
+    """Compute the pnl of the trades kept in a `TradeStore`, holding at most `max_memory_bytes` of them at once."""
+    chunks = store.iter_chunks(exchange, symbol, start, end, chunk_rows=chunk_rows_for(max_memory_bytes))
+    return chunked_pnl_calculate(chunks, current_balance, meta)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+METHODS = ["fifo", "lifo", "average"]
+# quantities left over by a close below this fraction of the closed quantity are float noise, not an open lot
+QTY_EPSILON = 1e-9
+
+
+def _match_lots(sides, qtys, prices, method):
+    """
+    Walk the fills once, matching each one against the open lots of the opposite direction.
+
+    Lots live in preallocated lists used as a queue (fifo) or a stack (lifo) with `head`/`tail` pointers, so every
+    fill opens at most one lot and the total work is linear in the number of fills. Lot quantities are signed: long
+    lots are positive and short lots (sells beyond the inventory) are negative.
+    """
+    n = len(qtys)
+    realized = [0.0] * n
+    lot_qty = [0.0] * n
+    lot_price = [0.0] * n
+    lot_fill = [0] * n
+    head = 0
+    tail = 0
+    fifo = method == "fifo"
+    for i in range(n):
+        remaining = qtys[i] if sides[i] else -qtys[i]
+        price = prices[i]
+        pnl = 0.0
+        while remaining != 0.0 and head < tail:
+            j = head if fifo else tail - 1
+            open_qty = lot_qty[j]
+            if (open_qty > 0) == (remaining > 0):
+                break
+            closed = min(abs(open_qty), abs(remaining))
+            if open_qty > 0:
+                pnl += closed * (price - lot_price[j])
+                lot_qty[j] = open_qty - closed
+                remaining += closed
+            else:
+                pnl += closed * (lot_price[j] - price)
+                lot_qty[j] = open_qty + closed
+                remaining -= closed
+            if abs(lot_qty[j]) <= QTY_EPSILON * closed:
+                lot_qty[j] = 0.0
+                if fifo:
+                    head += 1
+                else:
+                    tail -= 1
+            if abs(remaining) <= QTY_EPSILON * closed:
+                remaining = 0.0
+        if remaining != 0.0:
+            lot_qty[tail] = remaining
+            lot_price[tail] = price
+            lot_fill[tail] = i
+            tail += 1
+        realized[i] = pnl
+    return realized, lot_qty[head:tail], lot_price[head:tail], lot_fill[head:tail]
+
+
+def _average_cost(sides, qtys, prices):
+    n = len(qtys)
+    realized = [0.0] * n
+    position = 0.0
+    avg_price = 0.0
+    opened_at = 0
+    for i in range(n):
+        qty = qtys[i] if sides[i] else -qtys[i]
+        price = prices[i]
+        # zero-quantity fills neither open nor close anything, and would divide by zero on a flat position
+        if qty == 0.0:
+            continue
+        if position == 0.0 or (position > 0) == (qty > 0):
+            avg_price = (avg_price * abs(position) + price * abs(qty)) / (abs(position) + abs(qty))
+            if position == 0.0:
+                opened_at = i
+            position += qty
+            continue
+        closed = min(abs(position), abs(qty))
+        realized[i] = closed * (price - avg_price) if position > 0 else closed * (avg_price - price)
+        position += qty
+        if abs(position) <= QTY_EPSILON * closed:
+            position = 0.0
+            avg_price = 0.0
+        elif abs(qty) > closed:
+            avg_price = price
+            opened_at = i
+    if position == 0.0:
+        return realized, [], [], []
+    return realized, [position], [avg_price], [opened_at]
+
+
+def realized_pnl(df, method="fifo", mark_price=None):
+    """
+    Match fills into lots with the `fifo`, `lifo` or `average` cost method.
+
+    Returns the realized pnl per fill (in quote asset, aligned with `df.index`), the remaining open lots and their
+    unrealized pnl at `mark_price` (quote per base, defaults to the last fill price). Fees are not part of the cost
+    basis, they are reported separately by `calc_trading_fees`.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown cost basis method {method}, expected one of {METHODS}")
+
+    order = np.argsort(df["date_time"].to_numpy(), kind="stable")
+    sides = (df["side"].to_numpy() == "buy")[order].tolist()
+    qtys = df["qty"].to_numpy(dtype="float64")[order].tolist()
+    prices = df["price"].to_numpy(dtype="float64")[order].tolist()
+
+    if method == "average":
+        realized, lot_qty, lot_price, lot_fill = _average_cost(sides, qtys, prices)
+    else:
+        realized, lot_qty, lot_price, lot_fill = _match_lots(sides, qtys, prices, method)
+
+    realized_by_fill = np.empty(len(order), dtype="float64")
+    realized_by_fill[order] = realized
+    s_realized = pd.Series(realized_by_fill, index=df.index, name="realized_pnl")
+
+    if mark_price is None:
+        mark_price = prices[-1] if prices else 0.0
+    df_open_lots = pd.DataFrame(
+        {
+            "date_time": df["date_time"].to_numpy()[order][lot_fill],
+            "qty": np.asarray(lot_qty, dtype="float64"),
+            "price": np.asarray(lot_price, dtype="float64"),
+        }
+    )
+    df_open_lots["unrealized_pnl"] = df_open_lots["qty"] * (mark_price - df_open_lots["price"])
+    return s_realized, df_open_lots, df_open_lots["unrealized_pnl"].sum()
@@ -0,0 +1,176 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from src.processing import commissions_frame, fees_usd, pnl_from_aggregates
+
+# below this magnitude a float64 holds every scaled value with at least 1/500 of a unit of headroom, so rounding the
+# parsed float recovers the exact integer and leftover digits beyond the scale are still detectable
+_FAST_PATH_LIMIT = 2.0**43
+
+
+def decimals_from_increment(increment):
+    """Number of decimals of a tick/lot size such as "0.0001" (4) or "1" (0)."""
+    text = str(increment).rstrip("0")
+    return len(text.split(".")[1]) if "." in text else 0
+
+
+def _decimal_strings(values):
+    text = pd.Series(values, dtype=object)
+    if text.isna().any():
+        raise ValueError("Values are missing")
+    return text.astype(str).str.strip()
+
+
+def _check_decimals(fraction, decimals):
+    if (fraction.str.slice(decimals).str.rstrip("0").str.len() > 0).any():
+        raise ValueError(f"Values have more than {decimals} decimals")
+
+
+def _parse_scaled_strings(text, decimals):
+    negative = text.str.startswith("-").to_numpy()
+    parts = text.str.lstrip("+-").str.partition(".")
+    whole = parts[0].replace("", "0").astype("int64").to_numpy()
+    fraction = parts[2]
+    _check_decimals(fraction, decimals)
+    if decimals:
+        digits = fraction.str.slice(0, decimals).str.pad(decimals, side="right", fillchar="0").astype("int64")
+        digits = digits.to_numpy()
+    else:
+        digits = np.zeros(len(whole), dtype="int64")
+    max_whole, max_digits = divmod(2**63 - 1, 10**decimals)
+    if ((whole > max_whole) | ((whole == max_whole) & (digits > max_digits))).any():
+        raise OverflowError(f"Values do not fit int64 at {decimals} decimals")
+    scaled = whole * 10**decimals + digits
+    return np.where(negative, -scaled, scaled)
+
+
+def parse_scaled(values, decimals):
+    """
+    Parse decimal strings (or numbers) into int64 values scaled by 10**decimals, without going through `Decimal`.
+
+    Numbers small enough for float64 to represent every scaled value exactly are parsed by numpy and rounded to the
+    nearest integer; larger ones are split into integer and fraction digits with vectorized string operations.
+    Raises ValueError when a value is missing, not finite or has more decimals than the scale can hold, and
+    OverflowError when it does not fit int64 at that scale.
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.empty(0, dtype="int64")
+    text = _decimal_strings(values) if values.dtype.kind in "OSU" else None
+    floats = np.asarray(text if text is not None else values, dtype="float64") * 10.0**decimals
+    if not np.isfinite(floats).all():
+        raise ValueError("Values are missing or not finite")
+    if np.abs(floats).max() >= _FAST_PATH_LIMIT:
+        return _parse_scaled_strings(text if text is not None else _decimal_strings(values), decimals)
+    if text is not None:
+        # checked on the strings, float64 cannot tell 1.000000000001 from 1 once scaled
+        _check_decimals(text.str.partition(".")[2], decimals)
+    scaled = np.rint(floats)
+    if (np.abs(floats - scaled) > 1e-3).any():
+        raise ValueError(f"Values have more than {decimals} decimals")
+    return scaled.astype("int64")
+
+
+def _scaled_product(left, right, left_decimals, right_decimals, decimals):
+    """Exact `left * right` rescaled (half up) from `left_decimals + right_decimals` to `decimals`."""
+    shift = left_decimals + right_decimals - decimals
+    bound = int(np.abs(left).max(initial=0)) * int(np.abs(right).max(initial=0))
+    if bound < 2**62 // 10 ** max(0, -shift):
+        product = left * right
+    else:
+        # python ints for the rare magnitudes that would overflow int64 before rescaling
+        product = left.astype(object) * right.astype(object)
+    if shift > 0:
+        half = 10**shift // 2
+        product = np.where(product >= 0, (product + half) // 10**shift, -((-product + half) // 10**shift))
+    elif shift < 0:
+        product = product * 10**-shift
+    if np.abs(product).max(initial=0) >= 2**63:
+        raise OverflowError(f"Product does not fit int64 at {decimals} decimals")
+    return np.asarray(product).astype("int64")
+
+
+def fixed_point_column(df, spec, column, scales):
+    if column in spec.fixed:
+        return np.full(len(df), parse_scaled([spec.fixed[column]], scales[column])[0], dtype="int64")
+    if column == "quoteQty" and spec.quote_from_price:
+        price = parse_scaled(df[spec.source("price")].to_numpy(), scales["price"])
+        qty = parse_scaled(df[spec.source("qty")].to_numpy(), scales["qty"])
+        return _scaled_product(price, qty, scales["price"], scales["qty"], scales["quoteQty"])
+    return parse_scaled(df[spec.source(column)].to_numpy(), scales[column])
+
+
+def exact_sum(values):
+    """
+    Exact sum of int64 values as a python int, at numpy speed.
+
+    Each value is split into its high and low 32 bits, which are summed separately and cannot overflow for fewer than
+    2**31 values; only the two partial sums are combined as python ints.
+    """
+    values = np.asarray(values, dtype="int64")
+    return int((values >> 32).sum()) * 2**32 + int((values & 0xFFFFFFFF).sum())
+
+
+def aggregate_fixed_point(df):
+    """`aggregate_trades` over a fixed-point frame, with every sum an exact python int."""
+    buys = (df["side"] == "buy").to_numpy()
+    sells = (df["side"] == "sell").to_numpy()
+    qty = df["qty"].to_numpy()
+    quote_qty = df["quoteQty"].to_numpy()
+    commission = df["commission"].to_numpy()
+    fee_assets = df["commissionAsset"].to_numpy()
+    fee_prices = df["commissionAssetUsdPrice"].to_numpy()
+    commissions = {}
+    for asset in pd.unique(fee_assets):
+        if pd.isna(asset):
+            continue
+        mask = fee_assets == asset
+        commissions[asset] = [exact_sum(commission[mask]), fee_prices[mask][0]]
+    return {
+        "num_trades": len(df),
+        "num_buys": int(buys.sum()),
+        "num_sells": int(sells.sum()),
+        "base_buys": exact_sum(qty[buys]),
+        "base_sells": exact_sum(qty[sells]),
+        "quote_proceeds": exact_sum(quote_qty[sells]),
+        "quote_spent": exact_sum(quote_qty[buys]),
+        "base_traded": exact_sum(qty),
+        "quote_traded": exact_sum(quote_qty),
+        "first_trade": df["date_time"].min(),
+        "last_trade": df["date_time"].max(),
+        "commissions": dict(sorted(commissions.items())),
+    }
+
+
+def descale(value, decimals):
+    return float(Decimal(int(value)).scaleb(-decimals))
+
+
+def descale_aggregates(agg, scales):
+    """Turn the exact integer sums of `aggregate_fixed_point` into floats, rounding once."""
+    agg = dict(agg)
+    for key, column in [
+        ("base_buys", "qty"),
+        ("base_sells", "qty"),
+        ("base_traded", "qty"),
+        ("quote_proceeds", "quoteQty"),
+        ("quote_spent", "quoteQty"),
+        ("quote_traded", "quoteQty"),
+    ]:
+        agg[key] = descale(agg[key], scales[column])
+    agg["commissions"] = {
+        asset: [descale(amount, scales["commission"]), price] for asset, (amount, price) in agg["commissions"].items()
+    }
+    return agg
+
+
+def fixed_point_pnl_calculate(df, current_balance, meta, scales):
+    """`pnl_calculate` over a fixed-point frame: all sums are exact integer sums, descaled once at the end."""
+    return pnl_from_aggregates(descale_aggregates(aggregate_fixed_point(df), scales), current_balance, meta)
+
+
+def fixed_point_trading_fees(df, scales):
+    df_commissions = commissions_frame(descale_aggregates(aggregate_fixed_point(df), scales)["commissions"])
+    return fees_usd(df_commissions), df_commissions
@@ -0,0 +1,134 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.processing import pnl_calculate
+
+
+def fingerprint(obj):
+    """Content hash of a DataFrame/Series (values and index) or of any other repr-stable object."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        row_hashes = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+        digest = hashlib.sha1(row_hashes.tobytes())
+        labels = list(obj.columns) if isinstance(obj, pd.DataFrame) else [obj.name]
+        digest.update(repr(labels).encode("utf-8"))
+        return digest.hexdigest()
+    return hashlib.sha1(repr(obj).encode("utf-8")).hexdigest()
+
+
+def trades_fingerprint(df):
+    """
+    Cheap identity of a normalized trade frame: its row count and last fill time. Trades only ever get appended, so
+    a range whose count and last fill are unchanged holds the same fills, and checking it costs no hashing.
+    """
+    if len(df) == 0:
+        return 0, None
+    return len(df), df["date_time"].max()
+
+
+def _size_of(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(index=True, deep=True)))
+    if isinstance(value, (tuple, list)):
+        return sum(_size_of(item) for item in value)
+    return len(repr(value))
+
+
+class PnlResultCache:
+    """
+    LRU cache of pnl results keyed by the exchange, symbol, date range and the balance/price snapshot the result was
+    computed with, each entry remembering the `trades_fingerprint` of the trades behind it.
+
+    The key needs no trades, so a lookup can happen before fetching them: `get` hands the cached fingerprint to an
+    `is_current` check, e.g. one page request for fills newer than the cached last fill, and drops the entry when
+    it fails. Only one entry is kept per exchange/symbol/range, other ranges are left untouched by new trades.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._fingerprints = {}
+        self._keys_by_range = {}
+        self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(exchange, symbol, start_date, end_date, current_balance, meta):
+        snapshot = (fingerprint(current_balance), sorted(meta.items()))
+        return exchange, symbol, start_date, end_date, fingerprint(snapshot)
+
+    def get(self, key, is_current=None):
+        if key in self._entries and is_current is not None and not is_current(self._fingerprints[key]):
+            self.invalidate(key)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def get_range(self, exchange, symbol, start_date, end_date, is_current=None):
+        """The key and value of a range's entry whatever snapshot it was computed with, `(None, None)` without one."""
+        key = self._keys_by_range.get((exchange, symbol, start_date, end_date))
+        value = None if key is None else self.get(key, is_current)
+        return (None, None) if value is None else (key, value)
+
+    def put(self, key, value, trades):
+        range_key = key[:4]
+        stale_key = self._keys_by_range.get(range_key)
+        if stale_key is not None and stale_key != key:
+            self.invalidate(stale_key)
+        if key in self._entries:
+            self.invalidate(key)
+        size = _size_of(value)
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._fingerprints[key] = trades
+        self._keys_by_range[range_key] = key
+        self._total_bytes += size
+        self._evict()
+
+    def invalidate(self, key):
+        if key not in self._entries:
+            return
+        del self._entries[key]
+        self._total_bytes -= self._sizes.pop(key)
+        del self._fingerprints[key]
+        if self._keys_by_range.get(key[:4]) == key:
+            del self._keys_by_range[key[:4]]
+
+    def clear(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self._fingerprints.clear()
+        self._keys_by_range.clear()
+        self._total_bytes = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self.invalidate(oldest_key)
+
+    def pnl_calculate(self, exchange, symbol, start_date, end_date, df, current_balance, meta):
+        key = self.make_key(exchange, symbol, start_date, end_date, current_balance, meta)
+        trades = trades_fingerprint(df)
+        result = self.get(key, lambda cached: cached == trades)
+        if result is None:
+            result = pnl_calculate(df, current_balance, meta)
+            self.put(key, result, trades)
+        return result
+
+
+default_cache = PnlResultCache()
+
+
+def cached_pnl_calculate(exchange, symbol, start_date, end_date, df, current_balance, meta):
+    return default_cache.pnl_calculate(exchange, symbol, start_date, end_date, df, current_balance, meta)
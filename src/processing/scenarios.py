@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.abstract.normalization import MAKER_COLUMN
+from src.processing import aggregate_trades, commissions_frame, fees_usd
+
+TAKER = 0
+MAKER = 1
+
+
+@dataclass(frozen=True)
+class FeeSchedule:
+    """
+    A what-if fee schedule: fee rates on the quote notional of taker and maker fills (negative for rebates) and a
+    discount on the resulting fee, e.g. 0.25 for paying fees in BNB. `maker_rate` defaults to `taker_rate`.
+    """
+
+    name: str
+    taker_rate: float
+    maker_rate: Optional[float] = None
+    discount: float = 0.0
+
+    @property
+    def maker(self):
+        return self.taker_rate if self.maker_rate is None else self.maker_rate
+
+    def rates(self):
+        return np.array([self.taker_rate, self.maker]) * (1 - self.discount)
+
+
+def rate_matrix(schedules):
+    """Effective rate of every fill class (rows: taker, maker) under every schedule (columns)."""
+    return np.column_stack([schedule.rates() for schedule in schedules])
+
+
+def scenario_fees(notional, fill_classes, rates):
+    """
+    Fees of every scenario at once: `rates[c, s]` is the rate of fill class `c` under scenario `s`.
+
+    The fills are reduced in a single pass to their notional per class, and the scenarios are one
+    (classes x scenarios) product on top of it, so the cost is one pass over the fills however many scenarios.
+    """
+    volumes = np.bincount(fill_classes, weights=notional, minlength=rates.shape[0])
+    return volumes @ rates
+
+
+def scenario_pnl(df, schedules, current_balance, meta, is_maker=None):
+    """
+    Net pnl of the trades in `df` under each of the fee `schedules`, next to the fees actually paid.
+
+    Fees are charged on the quote notional of each fill valued at the current quote price, like the rest of the pnl.
+    `is_maker` flags maker fills (an array, or the name of a column of `df`); without it the `isMaker` column that
+    `format_data` adds for exchanges reporting liquidity is used. Without flags every fill is priced as taker, which
+    is only allowed when no schedule has a distinct maker rate. Returns one row per schedule, plus an "actual" row
+    from the recorded commissions, as `pnl_calculate` would report them.
+    """
+    agg = aggregate_trades(df)
+    total_balance_usd = current_balance["quote_value"].sum()
+    base_delta = agg["base_buys"] - agg["base_sells"]
+    quote_delta = agg["quote_proceeds"] - agg["quote_spent"]
+    trade_pnl = base_delta * meta["base_asset_price"] + quote_delta * meta["quote_asset_price"]
+
+    if is_maker is None and MAKER_COLUMN in df:
+        is_maker = MAKER_COLUMN
+    if isinstance(is_maker, str):
+        is_maker = df[is_maker]
+    if is_maker is None:
+        if any(schedule.maker != schedule.taker_rate for schedule in schedules):
+            raise ValueError("Schedules with distinct maker and taker rates need maker flags, the trades have none")
+        fill_classes = np.full(len(df), TAKER)
+    else:
+        if pd.isna(np.asarray(is_maker, dtype=object)).any():
+            raise ValueError("Every fill needs a maker flag to price maker and taker rates")
+        fill_classes = np.where(np.asarray(is_maker, dtype=bool), MAKER, TAKER)
+    notional = df["quoteQty"].to_numpy(dtype="float64") * meta["quote_asset_price"]
+    fees = scenario_fees(notional, fill_classes, rate_matrix(schedules))
+    actual_fees = fees_usd(commissions_frame(agg["commissions"]))
+
+    df_scenarios = pd.DataFrame(
+        {
+            "taker_rate": [np.nan] + [schedule.taker_rate for schedule in schedules],
+            "maker_rate": [np.nan] + [schedule.maker for schedule in schedules],
+            "discount": [np.nan] + [schedule.discount for schedule in schedules],
+            "fees_usd": np.concatenate([[actual_fees], fees]),
+        },
+        index=pd.Index(["actual"] + [schedule.name for schedule in schedules], name="scenario"),
+    )
+    df_scenarios["trade_pnl"] = trade_pnl
+    df_scenarios["net_pnl"] = trade_pnl - df_scenarios["fees_usd"]
+    df_scenarios["gain_loss"] = df_scenarios["net_pnl"] / (total_balance_usd - df_scenarios["net_pnl"])
+    df_scenarios["vs_actual"] = df_scenarios["net_pnl"] - df_scenarios.at["actual", "net_pnl"]
+    return df_scenarios
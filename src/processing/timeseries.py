@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+def pnl_timeseries(df, meta, freq="h"):
+    """
+    Bucket fills by `freq` (any pandas offset alias, e.g. "min", "h", "D") and compute per-bucket and cumulative
+    base delta, quote delta, fees and pnl marked at the current spot prices in `meta`.
+
+    Everything is done with column-wise numpy ops and a single groupby, so the cost is linear in the number of fills.
+    """
+    base_asset_price = meta["base_asset_price"]
+    quote_asset_price = meta["quote_asset_price"]
+
+    is_buy = (df["side"] == "buy").to_numpy()
+    sign = np.where(is_buy, 1.0, -1.0)
+    qty = df["qty"].to_numpy(dtype="float64")
+    quote_qty = df["quoteQty"].to_numpy(dtype="float64")
+    fees = df["commission"].to_numpy(dtype="float64") * df["commissionAssetUsdPrice"].to_numpy(dtype="float64")
+
+    df_flows = pd.DataFrame(
+        {
+            "date_time": df["date_time"].to_numpy(),
+            "trades": np.ones(len(df), dtype="int64"),
+            "buys": is_buy.astype("int64"),
+            "base_delta": sign * qty,
+            "quote_delta": -sign * quote_qty,
+            "fees_usd": fees,
+        }
+    )
+    df_series = df_flows.groupby(pd.Grouper(key="date_time", freq=freq)).sum()
+    df_series.insert(2, "sells", df_series["trades"] - df_series["buys"])
+
+    for column in ["base_delta", "quote_delta", "fees_usd"]:
+        df_series[f"cum_{column}"] = df_series[column].cumsum()
+
+    df_series["trade_pnl"] = df_series["base_delta"] * base_asset_price + df_series["quote_delta"] * quote_asset_price
+    df_series["net_pnl"] = df_series["trade_pnl"] - df_series["fees_usd"]
+    df_series["cum_trade_pnl"] = (
+        df_series["cum_base_delta"] * base_asset_price + df_series["cum_quote_delta"] * quote_asset_price
+    )
+    df_series["cum_net_pnl"] = df_series["cum_trade_pnl"] - df_series["cum_fees_usd"]
+    return df_series
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+from aiohttp import web
+
+from src.abstract.exchange_client_wrapper import NoTradesError
+from src.abstract.exchange_factory import create_client, trading_pair
+from src.batch.scheduler import job_payload, to_millis
+from src.processing import pnl_from_aggregates
+from src.storage.rollups import TradeRollups
+from src.storage.trade_store import TradeStore
+
+
+def load_accounts(path):
+    """
+    Read a JSON mapping of account name to `{"exchange": ..., "credentials": {...}}`, the credentials being passed
+    to the exchange's `create_instance`. Credentials stay server side, requests only name the account.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+class PnlService:
+    """
+    Compute pnl by account/pair/range for many clients while sharing all the expensive state between them.
+
+    One wrapper per account is kept for the life of the service, with its market catalog, conversion graph and
+    response cache. Fetched trades go to a day-partitioned `TradeStore` under `store_root`, with daily `TradeRollups`
+    answering range queries, and the covered range of every pair is remembered, so a later request only downloads
+    what lies outside it. Identical requests in flight are coalesced into one computation and finished results are
+    served from memory for `result_ttl` seconds.
+    """
+
+    def __init__(self, accounts, store_root, result_ttl=30, client_factory=create_client):
+        self.accounts = accounts
+        self.store_root = store_root
+        self.result_ttl = result_ttl
+        self.client_factory = client_factory
+        self._clients = {}
+        self._rollups = {}
+        self._clients_lock = threading.Lock()
+        self._pair_locks = {}
+        self._coverage_lock = threading.Lock()
+        self._coverage_path = os.path.join(store_root, "coverage.json")
+        self._coverage = {}
+        if os.path.exists(self._coverage_path):
+            with open(self._coverage_path) as f:
+                self._coverage = {key: tuple(span) for key, span in json.load(f).items()}
+        self._results = {}
+        self._inflight = {}
+
+    def client(self, account):
+        with self._clients_lock:
+            if account not in self._clients:
+                config = self.accounts[account]
+                self._clients[account] = self.client_factory(config["exchange"], **config["credentials"])
+            return self._clients[account]
+
+    def rollups(self, account):
+        with self._clients_lock:
+            if account not in self._rollups:
+                account_root = os.path.join(self.store_root, account)
+                store = TradeStore(os.path.join(account_root, "trades"), partition="day")
+                self._rollups[account] = TradeRollups(store, os.path.join(account_root, "rollups"))
+            return self._rollups[account]
+
+    def _pair_lock(self, key):
+        with self._clients_lock:
+            return self._pair_locks.setdefault(key, threading.Lock())
+
+    def _record_coverage(self, key, covered):
+        """Remember the range stored for a pair, pairs being computed concurrently write coverage.json one at a time."""
+        with self._coverage_lock:
+            self._coverage[key] = covered
+            os.makedirs(self.store_root, exist_ok=True)
+            tmp_path = f"{self._coverage_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._coverage, f)
+            os.replace(tmp_path, self._coverage_path)
+
+    def _fetch_into_store(self, client, rollups, exchange, pair, start_date, end_date):
+        try:
+            df = client.get_trades(pair, start_date, end_date)
+        except NoTradesError:
+            return
+        # exchanges paging by the second can return fills just outside the gap, which the store already holds
+        in_gap = (df["date_time"] >= pd.Timestamp(start_date, unit="ms")) & (
+            df["date_time"] <= pd.Timestamp(end_date, unit="ms")
+        )
+        if in_gap.any():
+            rollups.append(exchange, pair, df[in_gap])
+
+    def _aggregate(self, account, pair, start_date, end_date):
+        """
+        Download the parts of `[start_date, end_date]` not stored yet and return the aggregates of the range, built
+        from the daily rollups and the raw fills of its partial edge days.
+        """
+        exchange = self.accounts[account]["exchange"]
+        client = self.client(account)
+        rollups = self.rollups(account)
+        key = f"{account}/{pair}"
+        now = round(time.time() * 1000)
+        end_date = now if end_date is None else min(end_date, now)
+        with self._pair_lock(key):
+            # coverage is recorded as soon as each gap is stored: the store has no dedup, so a gap stored but not
+            # recorded would be downloaded and appended again by the next request
+            covered = self._coverage.get(key)
+            if covered is None:
+                self._fetch_into_store(client, rollups, exchange, pair, start_date, end_date)
+                self._record_coverage(key, (start_date, end_date))
+            else:
+                if start_date < covered[0]:
+                    self._fetch_into_store(client, rollups, exchange, pair, start_date, covered[0] - 1)
+                    covered = (start_date, covered[1])
+                    self._record_coverage(key, covered)
+                if end_date > covered[1]:
+                    self._fetch_into_store(client, rollups, exchange, pair, covered[1] + 1, end_date)
+                    self._record_coverage(key, (covered[0], end_date))
+            return rollups.aggregate(
+                exchange, pair, pd.Timestamp(start_date, unit="ms"), pd.Timestamp(end_date, unit="ms")
+            )
+
+    def compute(self, account, base_asset, quote_asset, start_date, end_date):
+        exchange = self.accounts[account]["exchange"]
+        pair = trading_pair(exchange, base_asset, quote_asset)
+        client = self.client(account)
+        agg = self._aggregate(account, pair, start_date, end_date)
+        if agg is None:
+            raise NoTradesError(f"We couldn't fetch trades for this trading pair {pair}")
+        balance, base, quote, base_price, quote_price = client.get_current_asset_balance(pair)
+        meta = {
+            "base_asset": base,
+            "quote_asset": quote,
+            "quote_asset_price": quote_price,
+            "base_asset_price": base_price,
+        }
+        payload = job_payload(pnl_from_aggregates(agg, balance, meta), balance)
+        payload.update({"account": account, "exchange": exchange, "trading_pair": pair, "meta": meta})
+        return payload
+
+    async def pnl(self, account, base_asset, quote_asset, start_date, end_date, refresh=False):
+        key = (account, base_asset, quote_asset, start_date, end_date)
+        cached = self._results.get(key)
+        if cached is not None and not refresh and time.time() - cached[0] < self.result_ttl:
+            return cached[1]
+        if key not in self._inflight:
+            loop = asyncio.get_running_loop()
+            self._inflight[key] = loop.run_in_executor(
+                None, self.compute, account, base_asset, quote_asset, start_date, end_date
+            )
+        future = self._inflight[key]
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key) is future and future.done():
+                del self._inflight[key]
+        now = time.time()
+        self._results = {k: v for k, v in self._results.items() if now - v[0] < self.result_ttl}
+        self._results[key] = (now, result)
+        return result
+
+    async def handle_pnl(self, request):
+        query = request.query
+        missing = [name for name in ["account", "base", "quote", "start"] if name not in query]
+        if missing:
+            return web.json_response({"error": f"missing parameters {missing}"}, status=400)
+        if query["account"] not in self.accounts:
+            return web.json_response({"error": f"unknown account {query['account']}"}, status=404)
+        start_date = to_millis(query["start"])
+        # open-ended ranges run up to the time of the computation, so identical ones still coalesce
+        end_date = to_millis(query["end"]) if "end" in query else None
+        try:
+            result = await self.pnl(
+                query["account"],
+                query["base"].upper(),
+                query["quote"].upper(),
+                start_date,
+                end_date,
+                refresh=query.get("refresh") in ["1", "true"],
+            )
+        except NoTradesError as e:
+            return web.json_response({"error": str(e)}, status=404)
+        return web.json_response(result, dumps=lambda value: json.dumps(value, default=str))
+
+    async def handle_health(self, request):
+        return web.json_response(
+            {"clients": sorted(self._clients), "cached_results": len(self._results), "in_flight": len(self._inflight)}
+        )
+
+    def app(self):
+        app = web.Application()
+        app.add_routes([web.get("/pnl", self.handle_pnl), web.get("/health", self.handle_health)])
+        return app
+
+
+def run_service(accounts_path, store_root, host="127.0.0.1", port=8080, **service_kwargs):
+    service = PnlService(load_accounts(accounts_path), store_root, **service_kwargs)
+    web.run_app(service.app(), host=host, port=port)
@@ -0,0 +1,173 @@
+import os
+
+import pandas as pd
+
+from src.processing import aggregate_trades, merge_aggregates, pnl_from_aggregates
+
+SUM_COLUMNS = [
+    "num_trades",
+    "num_buys",
+    "num_sells",
+    "base_buys",
+    "base_sells",
+    "quote_proceeds",
+    "quote_spent",
+    "base_traded",
+    "quote_traded",
+]
+COUNT_COLUMNS = ["num_trades", "num_buys", "num_sells"]
+PERIOD_AGG = {**{column: "sum" for column in SUM_COLUMNS}, "first_trade": "min", "last_trade": "max"}
+FEE_AGG = {"commission": "sum", "commissionAssetUsdPrice": "first"}
+
+
+def period_rollup(df, freq):
+    """Per-period sums, counts and bounds of a normalized trade frame, and its fees per period and asset."""
+    periods = df["date_time"].dt.floor(freq).rename("period")
+    buys = df["side"] == "buy"
+    sells = df["side"] == "sell"
+    frame = pd.DataFrame(
+        {
+            "num_trades": 1,
+            "num_buys": buys.astype("int64"),
+            "num_sells": sells.astype("int64"),
+            "base_buys": df["qty"].where(buys, 0.0),
+            "base_sells": df["qty"].where(sells, 0.0),
+            "quote_proceeds": df["quoteQty"].where(sells, 0.0),
+            "quote_spent": df["quoteQty"].where(buys, 0.0),
+            "base_traded": df["qty"],
+            "quote_traded": df["quoteQty"],
+            "first_trade": df["date_time"],
+            "last_trade": df["date_time"],
+        },
+        index=df.index,
+    )
+    df_periods = frame.groupby(periods).agg(PERIOD_AGG)
+    df_fees = df.groupby([periods, df["commissionAsset"]]).agg(FEE_AGG)
+    return df_periods, df_fees
+
+
+def _merge(left, right):
+    return left if right is None else merge_aggregates(left, right)
+
+
+class TradeRollups:
+    """
+    Daily (or, with `freq="h"`, hourly) aggregates of the trades kept in a `TradeStore`, per exchange/symbol.
+
+    `append` writes new fills to the store and folds them into the rollups of their periods. A range query combines
+    the rollups of the periods it fully covers, one row each, and aggregates raw fills only for the partial periods
+    at its two edges, so its cost grows with the number of periods rather than the number of fills. Rollups are
+    kept as CSV under `root` and rebuilt from the store when missing. Use a store with `partition="day"` so the edges
+    read only their own day.
+    """
+
+    def __init__(self, store, root, freq="D"):
+        self.store = store
+        self.root = root
+        self.freq = freq
+        self._rollups = {}
+
+    def _paths(self, exchange, symbol):
+        symbol_dir = os.path.join(self.root, exchange, symbol.replace("/", "_"))
+        return (
+            symbol_dir,
+            os.path.join(symbol_dir, f"periods_{self.freq}.csv"),
+            os.path.join(symbol_dir, f"fees_{self.freq}.csv"),
+        )
+
+    def _load(self, exchange, symbol):
+        key = (exchange, symbol)
+        if key in self._rollups:
+            return self._rollups[key]
+        _, periods_path, fees_path = self._paths(exchange, symbol)
+        if os.path.exists(periods_path):
+            df_periods = pd.read_csv(
+                periods_path, index_col="period", parse_dates=["period", "first_trade", "last_trade"]
+            )
+            df_fees = pd.read_csv(fees_path, index_col=["period", "commissionAsset"], parse_dates=["period"])
+            self._rollups[key] = (df_periods, df_fees)
+        else:
+            self._rollups[key] = (None, None)
+            self.rebuild(exchange, symbol)
+        return self._rollups[key]
+
+    def _save(self, exchange, symbol):
+        symbol_dir, periods_path, fees_path = self._paths(exchange, symbol)
+        df_periods, df_fees = self._rollups[(exchange, symbol)]
+        if df_periods is None:
+            return
+        os.makedirs(symbol_dir, exist_ok=True)
+        df_periods.to_csv(periods_path)
+        df_fees.to_csv(fees_path)
+
+    def _fold(self, exchange, symbol, df):
+        df_periods, df_fees = self._rollups[(exchange, symbol)]
+        new_periods, new_fees = period_rollup(df, self.freq)
+        if df_periods is not None:
+            new_periods = pd.concat([df_periods, new_periods])
+            new_periods = new_periods.groupby(level=0).agg(PERIOD_AGG)
+            new_fees = pd.concat([df_fees, new_fees]).groupby(level=[0, 1]).agg(FEE_AGG)
+        self._rollups[(exchange, symbol)] = (new_periods, new_fees)
+
+    def rebuild(self, exchange, symbol):
+        """Recompute the rollups of a symbol from the raw fills of the store."""
+        self._rollups[(exchange, symbol)] = (None, None)
+        for chunk in self.store.iter_chunks(exchange, symbol):
+            self._fold(exchange, symbol, chunk)
+        self._save(exchange, symbol)
+
+    def append(self, exchange, symbol, df):
+        """Store new fills and fold them into the rollups."""
+        if len(df) == 0:
+            return
+        self._load(exchange, symbol)
+        self.store.append(exchange, symbol, df)
+        self._fold(exchange, symbol, df)
+        self._save(exchange, symbol)
+
+    def aggregate(self, exchange, symbol, start, end):
+        """The `aggregate_trades` result of the stored fills between `start` and `end` (inclusive)."""
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end)
+        df_periods, df_fees = self._load(exchange, symbol)
+        first_full = start.ceil(self.freq)
+        # periods ending by `end` are fully covered; a fill at exactly `end` on a boundary belongs to the right edge
+        end_full = end.floor(self.freq)
+        if df_periods is None or first_full >= end_full:
+            return self._aggregate_raw(exchange, symbol, start, end)
+
+        agg = self._aggregate_raw(exchange, symbol, start, first_full - pd.Timedelta(1, "ns"))
+        covered = df_periods[(df_periods.index >= first_full) & (df_periods.index < end_full)]
+        if len(covered):
+            fees = df_fees[
+                (df_fees.index.get_level_values(0) >= first_full) & (df_fees.index.get_level_values(0) < end_full)
+            ]
+            fees = fees.groupby(level=1).agg(FEE_AGG)
+            full = {column: covered[column].sum() for column in SUM_COLUMNS}
+            # numpy counts would reach JSON responses as strings
+            full.update({column: int(full[column]) for column in COUNT_COLUMNS})
+            full.update(
+                {
+                    "first_trade": covered["first_trade"].min(),
+                    "last_trade": covered["last_trade"].max(),
+                    "commissions": {
+                        asset: [row["commission"], row["commissionAssetUsdPrice"]] for asset, row in fees.iterrows()
+                    },
+                }
+            )
+            agg = _merge(agg, full)
+        return _merge(agg, self._aggregate_raw(exchange, symbol, end_full, end))
+
+    def _aggregate_raw(self, exchange, symbol, start, end):
+        if start > end:
+            return None
+        df = self.store.load(exchange, symbol, start, end)
+        if len(df) == 0:
+            return None
+        return aggregate_trades(df)
+
+    def pnl_calculate(self, exchange, symbol, start, end, current_balance, meta):
+        agg = self.aggregate(exchange, symbol, start, end)
+        if agg is None:
+            raise Exception(f"No stored trades for {symbol} between {start} and {end}")
+        return pnl_from_aggregates(agg, current_balance, meta)
@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+from src.abstract.normalization import TRADE_COLUMNS
+
+TRADE_DTYPES = {
+    "price": "float64",
+    "qty": "float64",
+    "quoteQty": "float64",
+    "commission": "float64",
+    "commissionAsset": "object",
+    "side": "object",
+    "commissionAssetUsdPrice": "float64",
+}
+
+
+# strftime format of the partition file names per partitioning
+PARTITION_FORMATS = {"month": "%Y-%m", "day": "%Y-%m-%d"}
+
+
+class TradeStore:
+    """
+    Normalized trades (the frame returned by `get_trades`) on disk, one CSV partition per exchange/symbol/month.
+
+    Partitions are append-only and can be streamed back in bounded-size chunks, so histories larger than memory can
+    be processed without loading them at once. With `partition="day"` every day gets its own partition, so reading a
+    few days does not scan their whole month; a store must always be opened with the partitioning it was written with.
+    """
+
+    def __init__(self, root, partition="month"):
+        self.root = root
+        self.partition_format = PARTITION_FORMATS[partition]
+
+    def _symbol_dir(self, exchange, symbol):
+        return os.path.join(self.root, exchange, symbol.replace("/", "_"))
+
+    def append(self, exchange, symbol, df):
+        symbol_dir = self._symbol_dir(exchange, symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        df = df.sort_values("date_time", kind="stable")
+        months = df["date_time"].dt.strftime(self.partition_format)
+        for month, df_month in df.groupby(months, sort=True):
+            path = os.path.join(symbol_dir, f"{month}.csv")
+            df_month[TRADE_COLUMNS].to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+    def partitions(self, exchange, symbol, start=None, end=None):
+        symbol_dir = self._symbol_dir(exchange, symbol)
+        if not os.path.isdir(symbol_dir):
+            return []
+        first_month = pd.Timestamp(start).strftime(self.partition_format) if start is not None else None
+        last_month = pd.Timestamp(end).strftime(self.partition_format) if end is not None else None
+        paths = []
+        for name in sorted(os.listdir(symbol_dir)):
+            month = name[: -len(".csv")]
+            if (first_month and month < first_month) or (last_month and month > last_month):
+                continue
+            paths.append(os.path.join(symbol_dir, name))
+        return paths
+
+    def iter_chunks(self, exchange, symbol, start=None, end=None, chunk_rows=500000):
+        """Yield the stored trades between `start` and `end` (inclusive) in frames of at most `chunk_rows` rows."""
+        for path in self.partitions(exchange, symbol, start, end):
+            for chunk in pd.read_csv(path, dtype=TRADE_DTYPES, parse_dates=["date_time"], chunksize=chunk_rows):
+                if start is not None:
+                    chunk = chunk[chunk["date_time"] >= pd.Timestamp(start)]
+                if end is not None:
+                    chunk = chunk[chunk["date_time"] <= pd.Timestamp(end)]
+                if len(chunk):
+                    yield chunk
+
+    def load(self, exchange, symbol, start=None, end=None):
+        chunks = list(self.iter_chunks(exchange, symbol, start, end))
+        if not chunks:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+        return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,257 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import aiohttp
+import pandas as pd
+
+from src.abstract.exchange_client_wrapper import NoTradesError
+from src.abstract.httpRequest.columnar import loads
+from src.abstract.normalization import TRADE_COLUMNS
+
+
+class UserTradeStream(ABC):
+    """
+    Ingest the user's executions for one trading pair from an exchange WebSocket stream.
+
+    Every execution is normalized into the frame `format_data` produces and handed to `on_fills`. Each (re)connect
+    backfills the time since the last seen fill through the wrapper's REST `get_trades`, so fills executed while
+    disconnected are not lost; fills seen on both paths are dropped. Fills streamed without their fee are emitted at
+    once with a NaN commission; when `on_fees` is given their REST copies are fetched every `fee_backfill_interval`
+    seconds and handed to it as fee corrections, never to `on_fills` again. Any error other than cancellation
+    reconnects. Pass `ws_url` to connect to a local stand-in instead of the exchange.
+    """
+
+    reconnect_delay = 5
+    fee_backfill_interval = 10
+
+    def __init__(self, wrapper, trading_pair, on_fills, since=None, ws_url=None, on_fees=None):
+        self.wrapper = wrapper
+        self.trading_pair = trading_pair
+        self.on_fills = on_fills
+        self.on_fees = on_fees
+        self.last_seen = since
+        self.ws_url = ws_url
+        self._prices = {}
+        self._recent_keys = set()
+        self._recent_order = deque()
+        self._pending_fees = {}
+        self._stopped = False
+        self._tasks = []
+
+    @abstractmethod
+    async def _connect_url(self): ...
+
+    @abstractmethod
+    def _parse(self, message):
+        """Return the normalized rows (dicts, `date_time` in ms) carried by a decoded stream message."""
+        ...
+
+    async def _on_connected(self, ws):
+        pass
+
+    def _spawn(self, coro):
+        """Run a helper task (pings, keepalives) for the lifetime of the current connection."""
+        self._tasks.append(asyncio.ensure_future(coro))
+
+    async def _in_executor(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _usd_price(self, asset):
+        # kept as long as the wrapper keeps its conversion graph, so a long-lived stream does not price with stale rates
+        price, fetched_at = self._prices.get(asset, (None, None))
+        if fetched_at is None or time.time() - fetched_at > self.wrapper.conversion_ttl:
+            price = await self._in_executor(self.wrapper.price_for, asset)
+            self._prices[asset] = (price, time.time())
+        return price
+
+    def _is_new(self, key, max_keys=10000):
+        if key in self._recent_keys:
+            return False
+        self._recent_keys.add(key)
+        self._recent_order.append(key)
+        if len(self._recent_order) > max_keys:
+            self._recent_keys.discard(self._recent_order.popleft())
+        return True
+
+    @staticmethod
+    def _fill_keys(df):
+        return list(zip(df["date_time"], df["side"], df["price"], df["qty"]))
+
+    def _emit(self, df):
+        keys = self._fill_keys(df)
+        is_new = [self._is_new(key) for key in keys]
+        has_fee = df["commission"].notna().tolist()
+        # an already emitted fill coming back with its fee is a correction for `on_fees`, not another fill
+        is_fee = [
+            not new and fee and self._pending_fees.pop(key, None) is not None
+            for key, new, fee in zip(keys, is_new, has_fee)
+        ]
+        if self.on_fees is not None:
+            for key, new, fee in zip(keys, is_new, has_fee):
+                if new and not fee:
+                    self._pending_fees[key] = key[0]
+            if any(is_fee):
+                self.on_fees(df[is_fee])
+        df = df[is_new]
+        if len(df) == 0:
+            return
+        newest = int(df["date_time"].max().value // 1_000_000)
+        self.last_seen = newest if self.last_seen is None else max(self.last_seen, newest)
+        self.on_fills(df)
+
+    async def _emit_rows(self, rows):
+        for row in rows:
+            row["commissionAssetUsdPrice"] = await self._usd_price(row["commissionAsset"])
+        df = pd.DataFrame(rows)
+        df["date_time"] = pd.to_datetime(df["date_time"], unit="ms")
+        self._emit(df[TRADE_COLUMNS])
+
+    async def _backfill(self):
+        start_date = self.last_seen
+        if self._pending_fees:
+            oldest = int(min(self._pending_fees.values()).value // 1_000_000)
+            start_date = oldest if start_date is None else min(start_date, oldest)
+        if start_date is None:
+            return
+        try:
+            df = await self._in_executor(
+                self.wrapper.get_trades, self.trading_pair, start_date, round(time.time() * 1000)
+            )
+        except NoTradesError:
+            return
+        self._emit(df.sort_values("date_time", kind="stable"))
+
+    async def _backfill_fees(self):
+        while not self._stopped:
+            await asyncio.sleep(self.fee_backfill_interval)
+            if not self._pending_fees:
+                continue
+            try:
+                await self._backfill()
+            except Exception as e:
+                print(f"user trade stream fee backfill failed {e}")
+
+    async def run(self):
+        async with aiohttp.ClientSession() as session:
+            while not self._stopped:
+                try:
+                    url = self.ws_url or await self._connect_url()
+                    async with session.ws_connect(url, heartbeat=30) as ws:
+                        await self._on_connected(ws)
+                        await self._backfill()
+                        self._spawn(self._backfill_fees())
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                rows = self._parse(loads(msg.data))
+                                if rows:
+                                    await self._emit_rows(rows)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                            if self._stopped:
+                                break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # REST backfills, listen key/token requests and unexpected messages fail too, not only the socket
+                    print(f"user trade stream disconnected {e!r}")
+                finally:
+                    for task in self._tasks:
+                        task.cancel()
+                    self._tasks = []
+                if not self._stopped:
+                    await asyncio.sleep(self.reconnect_delay)
+
+    def stop(self):
+        self._stopped = True
+
+
+class BinanceUserTradeStream(UserTradeStream):
+    """Executions from Binance's user data stream (`executionReport` events with execution type `TRADE`)."""
+
+    WS_URL = "wss://stream.binance.com:9443/ws"
+    keepalive_interval = 30 * 60
+
+    async def _connect_url(self):
+        listen_key = await self._in_executor(self.wrapper.client.stream_get_listen_key)
+        self._spawn(self._keepalive(listen_key))
+        return f"{self.WS_URL}/{listen_key}"
+
+    async def _keepalive(self, listen_key):
+        while not self._stopped:
+            await asyncio.sleep(self.keepalive_interval)
+            await self._in_executor(self.wrapper.client.stream_keepalive, listen_key)
+
+    def _parse(self, message):
+        if message.get("e") != "executionReport" or message.get("x") != "TRADE" or message["s"] != self.trading_pair:
+            return []
+        return [
+            {
+                "price": float(message["L"]),
+                "qty": float(message["l"]),
+                "quoteQty": float(message["Y"]),
+                "commission": float(message["n"]),
+                "commissionAsset": message["N"],
+                "side": "buy" if message["S"] == "BUY" else "sell",
+                "date_time": message["T"],
+            }
+        ]
+
+
+class KucoinUserTradeStream(UserTradeStream):
+    """
+    Executions from Kucoin's private `/spotMarket/tradeOrders` channel (`match` events).
+
+    Match events do not carry the fee: fills are emitted as they match with a NaN commission, and their fee reaches
+    `on_fees` from the periodic REST backfill.
+    """
+
+    TOPIC = "/spotMarket/tradeOrders"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ping_interval = 18
+
+    async def _connect_url(self):
+        token = await self._in_executor(self.wrapper.tradeClient._request, "POST", "/api/v1/bullet-private")
+        server = token["instanceServers"][0]
+        self._ping_interval = server["pingInterval"] / 1000
+        return f"{server['endpoint']}?token={token['token']}&connectId={int(time.time() * 1000)}"
+
+    async def _on_connected(self, ws):
+        await ws.send_json(
+            {
+                "id": int(time.time() * 1000),
+                "type": "subscribe",
+                "topic": self.TOPIC,
+                "privateChannel": True,
+                "response": True,
+            }
+        )
+        self._spawn(self._ping(ws))
+
+    async def _ping(self, ws):
+        while not ws.closed and not self._stopped:
+            await asyncio.sleep(self._ping_interval)
+            if not ws.closed:
+                await ws.send_json({"id": int(time.time() * 1000), "type": "ping"})
+
+    def _parse(self, message):
+        data = message.get("data") or {}
+        if message.get("topic") != self.TOPIC or data.get("type") != "match" or data["symbol"] != self.trading_pair:
+            return []
+        price = float(data["matchPrice"])
+        qty = float(data["matchSize"])
+        return [
+            {
+                "price": price,
+                "qty": qty,
+                "quoteQty": price * qty,
+                "commission": math.nan,
+                "commissionAsset": self.trading_pair.split("-")[1],
+                "side": data["side"],
+                "date_time": int(data["ts"]) // 1_000_000,
+            }
+        ]
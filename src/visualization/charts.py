@@ -0,0 +1,109 @@
+import numpy as np
+import plotly.graph_objects as go
+
+WEBGL_THRESHOLD = 10000
+MAX_POINTS = 2000
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype("int64").astype("float64")
+    return x.astype("float64")
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the `n_out` points that best preserve the visual shape of the series. The first and last
+    points are always kept.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = np.asarray(y, dtype="float64")
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    indices = np.empty(n_out, dtype="int64")
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Keep the min and max point of each of `n_buckets` equally sized buckets, i.e. one bucket per pixel column.
+
+    This preserves spikes that LTTB may smooth out, at up to twice the number of points.
+    """
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(0, n, n_buckets + 1).astype("int64")
+    indices = np.empty(2 * n_buckets, dtype="int64")
+    for i in range(n_buckets):
+        start, end = edges[i], edges[i + 1]
+        indices[2 * i] = start + y[start:end].argmin()
+        indices[2 * i + 1] = start + y[start:end].argmax()
+    return np.unique(indices)
+
+
+def downsample(x, y, max_points=MAX_POINTS, method="lttb"):
+    if method == "lttb":
+        indices = lttb_indices(x, y, max_points)
+    elif method == "minmax":
+        indices = minmax_indices(y, max_points // 2)
+    else:
+        raise ValueError(f"Unknown downsampling method {method}")
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+def scatter(x, y, max_points=MAX_POINTS, method="lttb", webgl_threshold=WEBGL_THRESHOLD, **kwargs):
+    """
+    Build a scatter trace for an arbitrarily long series.
+
+    The series is downsampled to `max_points` and rendered with `Scattergl` when it still has more than
+    `webgl_threshold` points (e.g. when downsampling is disabled with `max_points=None`).
+    """
+    if max_points is not None:
+        x, y = downsample(x, y, max_points, method)
+    trace_type = go.Scattergl if len(x) > webgl_threshold else go.Scatter
+    return trace_type(x=x, y=y, **kwargs)
+
+
+def zoomable_figure(x, y, max_points=MAX_POINTS, method="lttb", **kwargs):
+    """
+    Return a `FigureWidget` showing a downsampled view of the series that re-samples the visible range from the full
+    resolution data every time the user zooms or pans.
+
+    Once the visible range holds fewer than `max_points` points every fill is drawn.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    fig = go.FigureWidget(data=[scatter(x, y, max_points, method, **kwargs)])
+
+    def on_range_change(layout, x_range):
+        if x_range is None:
+            start, end = 0, len(x)
+        else:
+            lo, hi = np.array(x_range, dtype=x.dtype)
+            start, end = np.searchsorted(x, lo, side="left"), np.searchsorted(x, hi, side="right")
+        x_visible, y_visible = downsample(x[start:end], y[start:end], max_points, method)
+        with fig.batch_update():
+            fig.data[0].x = x_visible
+            fig.data[0].y = y_visible
+
+    fig.layout.on_change(on_range_change, "xaxis.range")
+    return fig
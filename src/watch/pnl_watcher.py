@@ -0,0 +1,114 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional, Set
+
+import pandas as pd
+
+from src.abstract.exchange_client_wrapper import NoTradesError
+from src.processing import aggregate_trades, merge_aggregates, pnl_from_aggregates
+
+
+@dataclass
+class WatchedPair:
+    name: str
+    client: Any
+    trading_pair: str
+    last_seen: int
+    agg: Optional[dict] = None
+    balance: Optional[pd.DataFrame] = None
+    meta: Optional[dict] = None
+    balance_refreshed_at: float = 0.0
+    # fills at `last_seen`, exchanges with second resolution return them again on the next poll
+    boundary_keys: Set[tuple] = field(default_factory=set)
+
+
+def _fill_keys(df):
+    return list(zip(df["date_time"], df["side"], df["price"], df["qty"], df["commission"]))
+
+
+class PnlWatcher:
+    """
+    Keep the pnl of a set of pairs up to date by polling the wrappers' `get_trades` for fills newer than the last one
+    seen and folding them into running aggregates.
+
+    Fills are polled every `poll_interval` seconds; balances and prices, which only mark the totals, are refreshed
+    on their own `balance_interval`.
+    """
+
+    def __init__(self, poll_interval=5, balance_interval=60, on_update=None):
+        self.poll_interval = poll_interval
+        self.balance_interval = balance_interval
+        self.on_update = on_update
+        self.pairs = {}
+
+    def add(self, name, client, trading_pair, start_date):
+        self.pairs[name] = WatchedPair(name=name, client=client, trading_pair=trading_pair, last_seen=start_date)
+
+    def _refresh_balance(self, pair, now):
+        balance, base, quote, base_price, quote_price = pair.client.get_current_asset_balance(pair.trading_pair)
+        pair.balance = balance
+        pair.meta = {
+            "base_asset": base,
+            "quote_asset": quote,
+            "quote_asset_price": quote_price,
+            "base_asset_price": base_price,
+        }
+        pair.balance_refreshed_at = now
+
+    def _poll_trades(self, pair):
+        now_ms = round(time.time() * 1000)
+        try:
+            df = pair.client.get_trades(pair.trading_pair, pair.last_seen, now_ms)
+        except NoTradesError:
+            return 0
+        last_seen = pd.Timestamp(pair.last_seen, unit="ms")
+        df = df[df["date_time"] >= last_seen]
+        if pair.boundary_keys:
+            at_boundary = df["date_time"] == last_seen
+            seen = pd.Series([key in pair.boundary_keys for key in _fill_keys(df)], index=df.index, dtype=bool)
+            df = df[~(at_boundary & seen)]
+        if len(df) == 0:
+            return 0
+
+        pair.agg = merge_aggregates(pair.agg, aggregate_trades(df))
+        newest = df["date_time"].max()
+        newest_keys = set(_fill_keys(df[df["date_time"] == newest]))
+        pair.boundary_keys = pair.boundary_keys | newest_keys if newest == last_seen else newest_keys
+        pair.last_seen = int(newest.value // 1_000_000)
+        return len(df)
+
+    def _poll_pair(self, pair, now):
+        new_fills = self._poll_trades(pair)
+        balance_due = now - pair.balance_refreshed_at >= self.balance_interval
+        if balance_due:
+            self._refresh_balance(pair, now)
+        if pair.agg is None or (new_fills == 0 and not balance_due):
+            return None
+        return pnl_from_aggregates(pair.agg, pair.balance, pair.meta)
+
+    def poll_once(self):
+        """
+        Poll every pair once. A pair whose exchange errors is skipped until the next poll: its aggregates and
+        `last_seen` only move once its fills are folded in, and a failed balance refresh is retried next time.
+        """
+        now = time.time()
+        updates = {}
+        for pair in self.pairs.values():
+            try:
+                pnl = self._poll_pair(pair, now)
+                if pnl is None:
+                    continue
+                updates[pair.name] = pnl
+                if self.on_update is not None:
+                    self.on_update(pair.name, pnl)
+            except Exception as e:
+                print(f"watch {pair.name} failed ({e}), retrying next poll")
+        return updates
+
+    def run(self, iterations=None):
+        count = 0
+        while iterations is None or count < iterations:
+            started = time.time()
+            self.poll_once()
+            count += 1
+            time.sleep(max(0.0, self.poll_interval - (time.time() - started)))
@@ -0,0 +1,69 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.processing import pnl_calculate
+from src.processing.chunked import store_pnl_calculate
+from src.storage.trade_store import TradeStore
+
+MAX_MEMORY_BYTES = 4 * 1024 * 1024
+# chunks are summed in a different order than the whole frame, and floats are round-tripped through CSV
+RTOL = 1e-9
+
+
+@pytest.fixture
+def trades():
+    rng = np.random.default_rng(7)
+    n = 100_000
+    price = rng.uniform(20_000, 40_000, n)
+    qty = rng.uniform(0.0001, 2, n)
+    return pd.DataFrame(
+        {
+            "price": price,
+            "qty": qty,
+            "quoteQty": price * qty,
+            "commission": qty * 0.001,
+            "commissionAsset": rng.choice(["BTC", "BNB"], n),
+            "side": rng.choice(["buy", "sell"], n),
+            "commissionAssetUsdPrice": 30_000.0,
+            "date_time": pd.Timestamp("2022-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 90 * 86400, n)), "s"),
+        }
+    )
+
+
+@pytest.fixture
+def balance():
+    df = pd.DataFrame({"asset": ["BTC", "USDT"], "price": [30_000.0, 1.0], "balance": [3.0, 50_000.0]})
+    df["quote_value"] = df["price"] * df["balance"]
+    return df.set_index("asset")
+
+
+META = {"base_asset": "BTC", "quote_asset": "USDT", "base_asset_price": 30_000.0, "quote_asset_price": 1.0}
+
+
+def test_store_pnl_calculate_stays_under_memory_limit(tmp_path, trades, balance):
+    store = TradeStore(str(tmp_path))
+    store.append("binance", "BTCUSDT", trades)
+    expected = pnl_calculate(trades, balance, META)
+    # the whole history is several times the limit, so staying under it means it was never loaded at once
+    assert trades.memory_usage(deep=True).sum() > 2 * MAX_MEMORY_BYTES
+
+    tracemalloc.start()
+    try:
+        result = store_pnl_calculate(store, "binance", "BTCUSDT", balance, META, max_memory_bytes=MAX_MEMORY_BYTES)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < MAX_MEMORY_BYTES
+    summary, df_summary_table, total_fees_usd, df_commissions = result
+    assert summary == expected[0]
+    pd.testing.assert_frame_equal(
+        df_summary_table.apply(pd.to_numeric, errors="coerce"),
+        expected[1].apply(pd.to_numeric, errors="coerce"),
+        rtol=RTOL,
+    )
+    assert total_fees_usd == pytest.approx(expected[2], rel=RTOL)
+    pd.testing.assert_frame_equal(df_commissions, expected[3], rtol=RTOL)
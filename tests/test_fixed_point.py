@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src.processing.fixed_point import parse_scaled
+
+
+def test_parse_scaled_fast_path():
+    values = np.array(["1.5", "-2.25", "30000.12345678", "0.00000001"], dtype=object)
+    assert parse_scaled(values, 8).tolist() == [150_000_000, -225_000_000, 3_000_012_345_678, 1]
+
+
+def test_parse_scaled_string_path():
+    # beyond 2**43 once scaled, parsed digit by digit
+    assert parse_scaled(["92233720368.54775807", "-1234567890.1"], 8).tolist() == [2**63 - 1, -123_456_789_010_000_000]
+
+
+@pytest.mark.parametrize("value", ["123456789012.12345678", "92233720368.54775808", "99999999999999999999"])
+def test_parse_scaled_overflow(value):
+    with pytest.raises(OverflowError):
+        parse_scaled([value], 8)
+
+
+@pytest.mark.parametrize("values", [[None], ["nan"], [np.nan], ["inf"], ["1.5", None]])
+def test_parse_scaled_rejects_missing(values):
+    with pytest.raises(ValueError):
+        parse_scaled(values, 8)
+
+
+@pytest.mark.parametrize("value", ["1.000000000001", "0.123456789", "123456789012.000000001"])
+def test_parse_scaled_rejects_extra_decimals(value):
+    with pytest.raises(ValueError):
+        parse_scaled([value], 8)
+
+
+def test_parse_scaled_accepts_trailing_zeros():
+    assert parse_scaled(["1.50000000000", "2"], 2).tolist() == [150, 200]